@@ -5,6 +5,7 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from cart.cart import merge_session_cart
 from .forms import CustomUserCreationForm
 from orders.models import Order
 
@@ -18,8 +19,12 @@ class CustomLoginView(LoginView):
         return context
     
     def form_valid(self, form):
+        # login() rotates the session key, so read the anonymous cart's first
+        session_key = self.request.cart.get_session_key()
+        response = super().form_valid(form)
+        merge_session_cart(session_key, self.request.user)
         messages.success(self.request, 'Welcome back!')
-        return super().form_valid(form)
+        return response
 
 def register_view(request):
     if request.user.is_authenticated:
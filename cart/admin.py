@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import CartItem
+from .models import CartItem, StockHold
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'quantity', 'total_price', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['user__username', 'product__name']
\ No newline at end of file
+    search_fields = ['user__username', 'product__name']
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    list_display = ['owner', 'product', 'quantity', 'expires_at']
+    list_select_related = ['product']
+    search_fields = ['owner', 'product__name']
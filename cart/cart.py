@@ -0,0 +1,308 @@
+# cart/cart.py
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum, F
+from django.utils import timezone
+from ecommerce_store.transactions import write_transaction
+from store.models import Product
+from . import holds
+from .models import CartItem, StockHold
+
+CART_SUMMARY_SESSION_KEY = 'cart_summary'
+PRICE_VERSION_CACHE_KEY = 'cart:price_version'
+CART_OPERATIONS = ('add', 'set', 'remove')
+MAX_CART_OPERATIONS = 100
+
+
+def _user_version_key(user_id):
+    return f'cart:user_version:{user_id}'
+
+
+def bump_price_version():
+    """Invalidate every stored cart summary, e.g. after a price change."""
+    cache.set(PRICE_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def bump_user_version(user_id):
+    """Invalidate a user's stored cart summary in all of their sessions."""
+    cache.set(_user_version_key(user_id), uuid.uuid4().hex, None)
+
+
+class CartOperationError(ValueError):
+    """A batch cart operation that cannot be applied; carries its index."""
+
+    def __init__(self, index, message):
+        super().__init__(f'operation {index}: {message}')
+        self.index = index
+        self.message = message
+
+
+def parse_operations(operations):
+    """Validate a batch of ``{"op", "product_id", "quantity"}`` dicts."""
+    if not isinstance(operations, list) or not operations:
+        raise CartOperationError(0, 'expected a non-empty list of operations')
+    if len(operations) > MAX_CART_OPERATIONS:
+        raise CartOperationError(MAX_CART_OPERATIONS, f'at most {MAX_CART_OPERATIONS} operations per request')
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in CART_OPERATIONS:
+            raise CartOperationError(index, f'op must be one of {", ".join(CART_OPERATIONS)}')
+        try:
+            product_id = int(operation.get('product_id'))
+            quantity = int(operation.get('quantity', 1 if operation['op'] == 'add' else 0))
+        except (TypeError, ValueError):
+            raise CartOperationError(index, 'product_id and quantity must be integers')
+        if quantity < 0 or operation['op'] == 'add' and quantity == 0:
+            raise CartOperationError(index, 'invalid quantity')
+        parsed.append((operation['op'], product_id, quantity))
+    return parsed
+
+
+def merge_session_cart(session_key, user):
+    """
+    Move an anonymous session's cart lines into ``user``'s cart on login.
+
+    A single ``INSERT ... SELECT ... ON CONFLICT`` adds each line to the
+    user's line for the same product, or creates one, capping the quantity
+    at the product's stock; lines for products that are unavailable or out
+    of stock are dropped. The session lines are then deleted. Returns the
+    number of lines merged, in the same few queries whatever the cart size.
+    """
+    if not session_key:
+        return 0
+    quote = connection.ops.quote_name
+    cart_table = quote(CartItem._meta.db_table)
+    product_table = quote(Product._meta.db_table)
+    least = 'MIN' if connection.vendor == 'sqlite' else 'LEAST'
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {cart_table} (user_id, session_key, product_id, quantity, created_at, updated_at) '
+                f'SELECT %s, NULL, line.product_id, {least}(line.quantity, product.stock), line.created_at, %s '
+                f'FROM {cart_table} line JOIN {product_table} product ON product.id = line.product_id '
+                f'WHERE line.session_key = %s AND line.user_id IS NULL '
+                f'AND product.available AND product.stock > 0 '
+                f'ON CONFLICT (user_id, product_id) WHERE user_id IS NOT NULL DO UPDATE SET '
+                f'quantity = {least}({cart_table}.quantity + excluded.quantity, '
+                f'(SELECT stock FROM {product_table} WHERE id = excluded.product_id)), '
+                f'updated_at = excluded.updated_at',
+                [user.pk, connection.ops.adapt_datetimefield_value(timezone.now()), session_key]
+            )
+            merged = cursor.rowcount
+        CartItem.objects.filter(session_key=session_key, user__isnull=True).delete()
+        # Checkout re-reserves the merged lines under the user
+        StockHold.objects.filter(owner=holds.hold_owner(session_key=session_key)).delete()
+    if merged:
+        bump_user_version(user.pk)
+    return merged
+
+
+class Cart:
+    """
+    The current visitor's cart, attached to the request as ``request.cart``.
+
+    Cart lines are fetched (with their products) at most once per request and
+    the item count and total are memoized, so the header badge, the cart views
+    and checkout all share the same data.
+
+    The count and total are also kept in the session, stamped with the
+    current price version (and, for users, their cart version), so pages that
+    only show the badge don't touch CartItem at all.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._items = None
+        self._summary = None
+
+    def get_session_key(self, create=False):
+        """
+        The anonymous cart's session key. Sessions are only created, with
+        ``create=True``, when something is actually put in the cart, so
+        visitors who just browse never get a session row.
+        """
+        session = self.request.session
+        if session.session_key:
+            # Loading the session drops a key from a stale or forged cookie
+            session.get(CART_SUMMARY_SESSION_KEY)
+        if create and not session.session_key:
+            session.create()
+        return session.session_key
+
+    def get_hold_owner(self, create=False):
+        """The key this cart's stock holds are stored under (see cart.holds)."""
+        if self.request.user.is_authenticated:
+            return holds.hold_owner(user=self.request.user)
+        return holds.hold_owner(session_key=self.get_session_key(create=create))
+
+    def get_queryset(self):
+        if self.request.user.is_authenticated:
+            return CartItem.objects.filter(user=self.request.user)
+        session_key = self.get_session_key()
+        if not session_key:
+            return CartItem.objects.none()
+        return CartItem.objects.filter(session_key=session_key)
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = list(
+                self.get_queryset()
+                .select_related('product__category')
+                .order_by('created_at', 'id')
+            )
+        return self._items
+
+    def _has_owner(self):
+        return self.request.user.is_authenticated or bool(self.get_session_key())
+
+    def _get_stamp(self):
+        keys = [PRICE_VERSION_CACHE_KEY]
+        if self.request.user.is_authenticated:
+            keys.append(_user_version_key(self.request.user.pk))
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Never stamp a summary with a missing version, or an evicted
+                # key could make an old summary look current again.
+                versions[key] = uuid.uuid4().hex
+                if not cache.add(key, versions[key], None):
+                    versions[key] = cache.get(key)
+        return [versions[key] for key in keys]
+
+    def _get_stored_summary(self, stamp):
+        stored = self.request.session.get(CART_SUMMARY_SESSION_KEY)
+        if stored and stored.get('stamp') == stamp:
+            return stored['count'], Decimal(stored['total'])
+        return None
+
+    def get_summary(self):
+        """Return ``(item_count, total)`` from memory, the session or the database."""
+        if self._summary is not None:
+            return self._summary
+        if not self._has_owner():
+            self._summary = (0, 0)
+            return self._summary
+
+        stamp = self._get_stamp()
+        if self._items is not None:
+            self._summary = (
+                sum(item.quantity for item in self._items),
+                sum(item.total_price for item in self._items),
+            )
+        else:
+            self._summary = self._get_stored_summary(stamp)
+            if self._summary is not None:
+                return self._summary
+            totals = self.get_queryset().aggregate(
+                count=Sum('quantity'),
+                total=Sum(F('quantity') * F('product__price')),
+            )
+            self._summary = (totals['count'] or 0, totals['total'] or 0)
+
+        count, total = self._summary
+        stored = {'count': count, 'total': str(total), 'stamp': stamp}
+        if self.request.session.get(CART_SUMMARY_SESSION_KEY) != stored:
+            self.request.session[CART_SUMMARY_SESSION_KEY] = stored
+        return self._summary
+
+    @property
+    def count(self):
+        return self.get_summary()[0]
+
+    @property
+    def total(self):
+        return self.get_summary()[1]
+
+    def invalidate(self):
+        """Forget loaded lines and totals after the cart has been changed."""
+        self._items = None
+        self._summary = None
+        if self.request.user.is_authenticated:
+            # A new version outdates the stored summary without a session write
+            bump_user_version(self.request.user.pk)
+        else:
+            self.request.session.pop(CART_SUMMARY_SESSION_KEY, None)
+
+    def apply(self, operations):
+        """
+        Apply parsed ``(op, product_id, quantity)`` operations atomically.
+
+        ``add`` increases a line, ``set`` replaces its quantity (0 removes
+        it) and ``remove`` deletes it, in order. Products and the current
+        lines are each read in one query and the result is written with at
+        most one insert, one update and one delete, and every line is held
+        with ``holds.reserve``. Raises CartOperationError, leaving the cart
+        untouched, if any line would need more units than are available.
+        """
+        product_ids = {product_id for _, product_id, _ in operations}
+        # Created outside the transaction, whose rollback the session would miss
+        hold_owner = self.get_hold_owner(create=any(quantity for op, _, quantity in operations if op != 'remove'))
+        with write_transaction():
+            lines = {
+                line.product_id: line
+                for line in self.get_queryset().filter(product_id__in=product_ids).select_for_update()
+            }
+            products = Product.objects.filter(pk__in=product_ids).only('name', 'stock', 'available').in_bulk()
+
+            quantities = {product_id: line.quantity for product_id, line in lines.items()}
+            last_index = {}
+            for index, (op, product_id, quantity) in enumerate(operations):
+                if op == 'add':
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                elif op == 'set':
+                    quantities[product_id] = quantity
+                else:
+                    quantities[product_id] = 0
+                last_index[product_id] = index
+
+            for product_id, quantity in quantities.items():
+                product = products.get(product_id)
+                if quantity and (product is None or not product.available):
+                    raise CartOperationError(last_index[product_id], 'product is not available')
+
+            short = holds.reserve(hold_owner, quantities) if hold_owner else {}
+            if short:
+                product_id = min(short, key=last_index.get)
+                raise CartOperationError(
+                    last_index[product_id], f'only {short[product_id]} of {products[product_id].name} available'
+                )
+
+            now = timezone.now()
+            if self.request.user.is_authenticated:
+                owner = {'user': self.request.user}
+            else:
+                owner = {'session_key': self.get_session_key()}
+            created, updated, removed = [], [], []
+            for product_id, quantity in quantities.items():
+                line = lines.get(product_id)
+                if line is None:
+                    if quantity:
+                        created.append(CartItem(product_id=product_id, quantity=quantity, **owner))
+                elif not quantity:
+                    removed.append(line.pk)
+                elif quantity != line.quantity:
+                    line.quantity, line.updated_at = quantity, now
+                    updated.append(line)
+
+            if created:
+                CartItem.objects.bulk_create(created)
+            if updated:
+                CartItem.objects.bulk_update(updated, ['quantity', 'updated_at'])
+            if removed:
+                CartItem.objects.filter(pk__in=removed).delete()
+        self.invalidate()
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
@@ -0,0 +1,56 @@
+# cart/cleanup.py
+"""
+Housekeeping for anonymous carts.
+
+Anonymous ``CartItem`` rows hang off a session key, so when a session
+expires its cart lines are orphaned. ``purge_expired_sessions`` clears the
+database session table and ``purge_orphaned_cart_items`` drops the lines no
+live session owns. Both delete in small batches so a large backlog never
+holds a long write lock.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from .models import CartItem
+
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
+
+
+def sessions_in_database():
+    return settings.SESSION_ENGINE in DB_SESSION_ENGINES
+
+
+def purge_expired_sessions(batch_size=1000):
+    """Delete expired rows from the session table; returns how many."""
+    if not sessions_in_database():
+        return 0
+    return _delete_in_batches(Session.objects.filter(expire_date__lt=timezone.now()), batch_size)
+
+
+def purge_orphaned_cart_items(batch_size=1000):
+    """Delete anonymous cart lines whose session is gone; returns how many."""
+    orphans = CartItem.objects.filter(user__isnull=True)
+    if sessions_in_database():
+        live = Session.objects.filter(expire_date__gte=timezone.now()).values('session_key')
+        orphans = orphans.exclude(session_key__in=live)
+    else:
+        # Cache and cookie sessions cannot be listed, but every cart change
+        # saves the session, so a line untouched for a full session lifetime
+        # has outlived it.
+        cutoff = timezone.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+        orphans = orphans.filter(updated_at__lt=cutoff)
+    return _delete_in_batches(orphans, batch_size)
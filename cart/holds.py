@@ -0,0 +1,103 @@
+# cart/holds.py
+"""
+Short-lived stock reservations.
+
+Adding to the cart, changing a quantity and opening checkout each place or
+refresh a ``StockHold`` for the cart's lines, valid for
+``STOCK_HOLD_SECONDS``. A product's available quantity is its stock minus
+everyone else's unexpired holds, so once the last units sit in one cart,
+other shoppers are turned away when they add to cart rather than after
+filling in the checkout form.
+
+Holds live in their own table and are written with one upsert per
+request, so busy products never queue on their ``Product`` row. They are
+advisory: checkout still decrements stock with a guarded UPDATE, so a
+race between two holds can never oversell. Expired holds are simply
+ignored; ``sweep_expired_holds`` deletes them in batches.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from store.models import Product
+from .models import StockHold
+
+
+def hold_owner(user=None, session_key=None):
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'session:{session_key}' if session_key else None
+
+
+def available_quantities(product_ids, exclude_owner=None):
+    """``{product_id: stock minus other carts' active holds}``, in one query."""
+    held = (
+        StockHold.objects
+        .filter(product=OuterRef('pk'), expires_at__gt=timezone.now())
+        .exclude(owner=exclude_owner)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    rows = (
+        Product.objects.filter(pk__in=list(product_ids))
+        .annotate(held=Coalesce(Subquery(held, output_field=IntegerField()), 0))
+        .values_list('pk', 'stock', 'held')
+    )
+    return {pk: max(stock - held, 0) for pk, stock, held in rows}
+
+
+def reserve(owner, quantities):
+    """
+    Hold ``{product_id: quantity}`` for ``owner``; a quantity of 0 releases.
+
+    Returns ``{product_id: available}`` for every product that cannot be
+    held in full, in which case nothing is changed. Otherwise all holds are
+    placed or extended and an empty dict is returned.
+    """
+    wanted = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    released = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+
+    if wanted:
+        available = available_quantities(wanted, exclude_owner=owner)
+        short = {
+            product_id: available.get(product_id, 0)
+            for product_id, quantity in wanted.items()
+            if quantity > available.get(product_id, 0)
+        }
+        if short:
+            return short
+        expires_at = timezone.now() + timedelta(seconds=settings.STOCK_HOLD_SECONDS)
+        StockHold.objects.bulk_create(
+            [
+                StockHold(owner=owner, product_id=product_id, quantity=quantity, expires_at=expires_at)
+                for product_id, quantity in wanted.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['owner', 'product'],
+            update_fields=['quantity', 'expires_at'],
+        )
+    if released:
+        StockHold.objects.filter(owner=owner, product_id__in=released).delete()
+    return {}
+
+
+def release(owner, product_ids=None):
+    """Drop ``owner``'s holds, on all products or just ``product_ids``."""
+    holds = StockHold.objects.filter(owner=owner)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=list(product_ids))
+    holds.delete()
+
+
+def sweep_expired_holds(batch_size=1000):
+    """Delete expired holds in batches; returns how many."""
+    deleted = 0
+    expired = StockHold.objects.filter(expires_at__lte=timezone.now())
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += StockHold.objects.filter(pk__in=pks).delete()[0]
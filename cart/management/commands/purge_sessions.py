@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from cart.cleanup import purge_expired_sessions, purge_orphaned_cart_items
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions and the anonymous cart lines they leave behind'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        sessions = purge_expired_sessions(options['batch_size'])
+        items = purge_orphaned_cart_items(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {sessions} expired sessions and {items} orphaned cart items'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from cart.holds import sweep_expired_holds
+
+class Command(BaseCommand):
+    help = 'Delete expired stock holds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = sweep_expired_holds(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired stock holds'))
@@ -0,0 +1,14 @@
+# cart/middleware.py
+from django.utils.functional import SimpleLazyObject
+from .cart import Cart
+
+
+class CartMiddleware:
+    """Attach a lazily loaded Cart to every request as ``request.cart``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.cart = SimpleLazyObject(lambda: Cart(request))
+        return self.get_response(request)
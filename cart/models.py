@@ -33,3 +33,28 @@ class CartItem(models.Model):
 
     def get_total_price(self):
         return self.product.price * self.quantity
+
+
+class StockHold(models.Model):
+    """
+    Units of a product set aside for one cart until ``expires_at``.
+
+    ``owner`` is ``user:<id>`` or ``session:<key>``, so signed-in and
+    anonymous carts share one unique key and holds can be upserted.
+    """
+    owner = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_holds')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='unique_hold_owner_product'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'expires_at'], name='cart_hold_product_exp_idx'),
+            models.Index(fields=['expires_at'], name='cart_hold_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} for {self.owner}"
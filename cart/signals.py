@@ -0,0 +1,12 @@
+# cart/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from store.models import Product
+from .cart import bump_price_version
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_cart_summaries(sender, **kwargs):
+    # Stored cart totals depend on product prices, and deleting a product
+    # removes its cart lines.
+    bump_price_version()
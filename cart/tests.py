@@ -0,0 +1,222 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.test import TestCase
+from django.utils import timezone
+from ecommerce_store.testing import QueryBudgetMixin
+from store.models import Category, Product
+from .cart import merge_session_cart
+from .cleanup import purge_expired_sessions, purge_orphaned_cart_items
+from .holds import available_quantities, sweep_expired_holds
+from .models import CartItem, StockHold
+
+
+class CartQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Mugs', slug='mugs')
+        self.products = [
+            Product.objects.create(
+                name=f'Mug {i}', slug=f'mug-{i}', category=category,
+                description='Mug', price=5, stock=50
+            )
+            for i in range(8)
+        ]
+        self.user = User.objects.create_user('cart', 'cart@example.com', 'pass12345')
+        self.client.force_login(self.user)
+        for product in self.products:
+            CartItem.objects.create(user=self.user, product=product, quantity=2)
+
+    def test_cart_detail(self):
+        response = self.assertWithinQueryBudget('/cart/')
+        self.assertEqual(len(response.context['cart_items']), 8)
+
+    def test_add_to_cart(self):
+        response = self.assertWithinQueryBudget(
+            '/cart/add/', method='post', data={'product_id': self.products[0].pk, 'quantity': 1}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_add_new_line_to_cart(self):
+        product = Product.objects.create(
+            name='Jug', slug='jug', category=self.products[0].category,
+            description='Jug', price=9, stock=5
+        )
+        response = self.assertWithinQueryBudget(
+            '/cart/add/', method='post', data={'product_id': product.pk, 'quantity': 1}
+        )
+        self.assertEqual(response.json()['cart_count'], 17)
+
+    def test_anonymous_first_add_to_cart(self):
+        # Creates the session as well as the line and its hold. That is one
+        # more session write than the usual add, which a TestCase wraps in
+        # a SAVEPOINT and RELEASE that production does not count
+        self.client.logout()
+        response = self.assertWithinQueryBudget(
+            '/cart/add/', method='post', data={'product_id': self.products[0].pk, 'quantity': 1},
+            budget=settings.QUERY_BUDGETS['cart:add_to_cart'] + 2
+        )
+        self.assertEqual(response.json()['cart_count'], 1)
+
+    def batch(self, operations, budget=None):
+        return self.assertWithinQueryBudget(
+            '/cart/batch/', method='post', data=json.dumps({'operations': operations}),
+            budget=budget, content_type='application/json'
+        )
+
+    def test_batch_applies_every_operation(self):
+        category = self.products[0].category
+        extra = [
+            Product.objects.create(
+                name=f'Plate {i}', slug=f'plate-{i}', category=category,
+                description='Plate', price=3, stock=10
+            )
+            for i in range(20)
+        ]
+        operations = [{'op': 'add', 'product_id': product.pk, 'quantity': 2} for product in extra]
+        operations += [
+            {'op': 'add', 'product_id': self.products[0].pk, 'quantity': 3},
+            {'op': 'set', 'product_id': self.products[1].pk, 'quantity': 7},
+            {'op': 'remove', 'product_id': self.products[2].pk},
+            {'op': 'set', 'product_id': self.products[3].pk, 'quantity': 0},
+        ]
+        data = self.batch(operations).json()
+        self.assertTrue(data['success'])
+        quantities = {item['product_id']: item['quantity'] for item in data['items']}
+        self.assertEqual(len(quantities), 26)
+        self.assertEqual(quantities[self.products[0].pk], 5)
+        self.assertEqual(quantities[self.products[1].pk], 7)
+        self.assertNotIn(self.products[2].pk, quantities)
+        self.assertEqual(data['cart_count'], 5 + 7 + 2 * 4 + 2 * 20)
+
+    def test_batch_over_stock_changes_nothing(self):
+        response = self.batch([
+            {'op': 'remove', 'product_id': self.products[0].pk},
+            {'op': 'add', 'product_id': self.products[1].pk, 'quantity': 49},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['index'], 1)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 8)
+
+
+class AnonymousSessionTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Mugs', slug='mugs')
+        self.product = Product.objects.create(
+            name='Mug', slug='mug', category=category, description='Mug', price=5, stock=50
+        )
+
+    def test_session_created_on_first_add_only(self):
+        for path in ['/', '/products/', '/cart/']:
+            self.client.get(path)
+        self.client.cookies['sessionid'] = 'no-such-session-key-0123456789'
+        self.client.get('/cart/')
+        self.assertFalse(Session.objects.exists())
+
+        self.client.post('/cart/add/', {'product_id': self.product.pk, 'quantity': 2})
+        session_key = self.client.session.session_key
+        self.assertEqual(Session.objects.get().session_key, session_key)
+        self.assertEqual(CartItem.objects.get().session_key, session_key)
+        self.assertEqual(self.client.get('/cart/').context['total'], 10)
+
+    def test_anonymous_visitor_cannot_touch_user_lines(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        item = CartItem.objects.create(user=user, product=self.product, quantity=1)
+        response = self.client.post('/cart/remove/', {'cart_item_id': item.pk})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/cart/update/').status_code, 405)
+        self.assertTrue(CartItem.objects.filter(pk=item.pk).exists())
+
+    def test_purge_removes_expired_sessions_and_their_lines(self):
+        self.client.post('/cart/add/', {'product_id': self.product.pk, 'quantity': 1})
+        live_key = self.client.session.session_key
+        Session.objects.create(
+            session_key='expired-session-key-0123456789',
+            session_data='', expire_date=timezone.now() - timedelta(days=1),
+        )
+        CartItem.objects.create(session_key='expired-session-key-0123456789', product=self.product)
+        CartItem.objects.create(session_key='never-saved-session-0123456789', product=self.product)
+
+        self.assertEqual(purge_expired_sessions(batch_size=1), 1)
+        self.assertEqual(purge_orphaned_cart_items(batch_size=1), 2)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [live_key])
+        self.assertEqual(list(CartItem.objects.values_list('session_key', flat=True)), [live_key])
+
+
+class LoginCartMergeTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Mugs', slug='mugs')
+        self.mug, self.cup, self.jug, self.bowl = [
+            Product.objects.create(
+                name=name, slug=name.lower(), category=category,
+                description=name, price=5, stock=stock
+            )
+            for name, stock in [('Mug', 10), ('Cup', 3), ('Jug', 0), ('Bowl', 10)]
+        ]
+        self.user = User.objects.create_user('merge', 'merge@example.com', 'pass12345')
+        CartItem.objects.create(user=self.user, product=self.cup, quantity=2)
+
+    def test_login_merges_session_lines(self):
+        for product, quantity in [(self.mug, 2), (self.cup, 3), (self.bowl, 1)]:
+            self.client.post('/cart/add/', {'product_id': product.pk, 'quantity': quantity})
+        session_key = self.client.session.session_key
+        # Sold out after it was added
+        CartItem.objects.create(session_key=session_key, product=self.jug, quantity=1)
+
+        response = self.client.post('/accounts/login/', {'username': 'merge', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            dict(CartItem.objects.filter(user=self.user).values_list('product__slug', 'quantity')),
+            {'mug': 2, 'cup': 3, 'bowl': 1}
+        )
+        self.assertFalse(CartItem.objects.filter(session_key=session_key).exists())
+        self.assertEqual(self.client.get('/cart/').context['total'], 30)
+
+    def test_merge_runs_in_constant_queries(self):
+        CartItem.objects.bulk_create([
+            CartItem(session_key='anonymous-session-0123456789', product=product, quantity=1)
+            for product in (self.mug, self.cup, self.bowl)
+        ])
+        with self.assertNumQueries(5):
+            merged = merge_session_cart('anonymous-session-0123456789', self.user)
+        self.assertEqual(merged, 3)
+
+
+class StockHoldTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Mugs', slug='mugs')
+        self.product = Product.objects.create(
+            name='Mug', slug='mug', category=category, description='Mug', price=5, stock=2
+        )
+        self.first = User.objects.create_user('first', 'first@example.com', 'pass12345')
+        self.second = User.objects.create_user('second', 'second@example.com', 'pass12345')
+
+    def add(self, user, quantity):
+        self.client.force_login(user)
+        return self.client.post('/cart/add/', {'product_id': self.product.pk, 'quantity': quantity}).json()
+
+    def test_held_units_are_not_available_to_others(self):
+        self.assertTrue(self.add(self.first, 2)['success'])
+        self.assertEqual(available_quantities([self.product.pk]), {self.product.pk: 0})
+
+        response = self.add(self.second, 1)
+        self.assertFalse(response['success'])
+        self.assertEqual(response['message'], 'Only 0 items available right now')
+        self.assertFalse(CartItem.objects.filter(user=self.second).exists())
+
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(self.add(self.second, 1)['success'])
+        self.assertEqual(sweep_expired_holds(), 1)
+
+    def test_checkout_releases_holds(self):
+        self.add(self.first, 1)
+        self.client.post('/orders/checkout/', {
+            'first_name': 'A', 'last_name': 'B', 'email': 'a@example.com', 'phone': '1',
+            'address': '1 Road', 'city': 'Town', 'state': 'ST', 'postal_code': '1',
+            'payment_method': 'cod',
+        })
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertFalse(StockHold.objects.exists())
@@ -10,4 +10,5 @@ urlpatterns = [
     path('update/', views.update_cart, name='update_cart'),
     path('remove/', views.remove_from_cart, name='remove_from_cart'),
     path('clear/', views.clear_cart, name='clear_cart'),
+    path('batch/', views.cart_batch, name='cart_batch'),
 ]
\ No newline at end of file
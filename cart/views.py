@@ -1,32 +1,24 @@
 # cart/views.py
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from django.db.models import OuterRef, Subquery
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from store.models import Product
+from . import holds
+from .cart import parse_operations
 from .models import CartItem
 import json
 
-def get_cart_items(request):
-    """Get cart items for current user or session"""
-    if request.user.is_authenticated:
-        return CartItem.objects.filter(user=request.user)
-    else:
-        session_key = request.session.session_key
-        if not session_key:
-            request.session.create()
-            session_key = request.session.session_key
-        return CartItem.objects.filter(session_key=session_key)
-
 def cart_detail(request):
-    cart_items = get_cart_items(request)
-    total = sum(item.quantity * item.product.price for item in cart_items)
+    cart = request.cart
     
     context = {
-        'cart_items': cart_items,
-        'total': total,
+        'cart_items': cart.items,
+        'total': cart.total,
         'show_checkout': request.user.is_authenticated,  # Add this line to control checkout button visibility
     }
     return render(request, 'cart/cart.html', context)
@@ -48,7 +40,21 @@ def add_to_cart(request):
                 'message': 'Quantity must be greater than 0'
             })
             
-        product = get_object_or_404(Product, id=product_id, available=True)
+        if request.user.is_authenticated:
+            owner = {'user': request.user}
+        else:
+            owner = {'session_key': request.cart.get_session_key()}
+        products = Product.objects.filter(available=True)
+        # The visitor's line for the product, if any, is read along with it;
+        # a visitor without a session has none to read
+        if any(owner.values()):
+            line = CartItem.objects.filter(product=OuterRef('pk'), **owner)
+            products = products.annotate(
+                line_id=Subquery(line.values('pk')),
+                line_quantity=Subquery(line.values('quantity')),
+            )
+        product = get_object_or_404(products, id=product_id)
+        line_id = getattr(product, 'line_id', None)
         
         if quantity > product.stock:
             return JsonResponse({
@@ -56,40 +62,34 @@ def add_to_cart(request):
                 'message': f'Only {product.stock} items available in stock'
             })
         
-        # Get or create cart item
-        if request.user.is_authenticated:
-            cart_item, created = CartItem.objects.get_or_create(
-                user=request.user,
-                product=product,
-                defaults={'quantity': 0}
-            )
-        else:
-            session_key = request.session.session_key
-            if not session_key:
-                request.session.create()
-                session_key = request.session.session_key
-            cart_item, created = CartItem.objects.get_or_create(
-                session_key=session_key,
-                product=product,
-                defaults={'quantity': 0}
-            )
-        
-        new_quantity = cart_item.quantity + quantity
+        new_quantity = (product.line_quantity if line_id else 0) + quantity
         if new_quantity > product.stock:
             return JsonResponse({
                 'success': False,
                 'message': f'Cannot add more. Only {product.stock} items available'
             })
+
+        # The line is only written once its units are held, so a refused
+        # add leaves nothing behind to clean up
+        if 'session_key' in owner:
+            owner['session_key'] = request.cart.get_session_key(create=True)
+        short = holds.reserve(request.cart.get_hold_owner(), {product.id: new_quantity})
+        if short:
+            return JsonResponse({
+                'success': False,
+                'message': f'Only {short[product.id]} items available right now'
+            })
+
+        if line_id is None:
+            CartItem.objects.create(product=product, quantity=new_quantity, **owner)
+        else:
+            CartItem.objects.filter(pk=line_id).update(quantity=new_quantity, updated_at=timezone.now())
+        request.cart.invalidate()
         
-        # Update quantity
-        cart_item.quantity = new_quantity
-        cart_item.save()
-        
-        cart_items_count = sum(item.quantity for item in get_cart_items(request))
         return JsonResponse({
             'success': True,
             'message': 'Product added to cart',
-            'cart_count': cart_items_count
+            'cart_count': request.cart.count
         })
     except ValueError:
         return JsonResponse({
@@ -112,19 +112,17 @@ def update_cart(request):
         cart_item_id = request.POST.get('cart_item_id')
         quantity = int(request.POST.get('quantity', 1))
     
-    if request.user.is_authenticated:
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, user=request.user)
-    else:
-        session_key = request.session.session_key
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, session_key=session_key)
+    cart_item = get_object_or_404(request.cart.get_queryset().select_related('product'), id=cart_item_id)
     
-    if quantity > cart_item.product.stock:
+    short = holds.reserve(request.cart.get_hold_owner(), {cart_item.product_id: max(quantity, 0)})
+    if short:
+        available = short[cart_item.product_id]
         if request.content_type == 'application/json':
             return JsonResponse({
                 'success': False,
-                'message': f'Only {cart_item.product.stock} items available'
+                'message': f'Only {available} items available'
             })
-        messages.error(request, f'Only {cart_item.product.stock} items available')
+        messages.error(request, f'Only {available} items available')
         return redirect('cart:cart_detail')
     
     if quantity <= 0:
@@ -134,6 +132,7 @@ def update_cart(request):
         cart_item.quantity = quantity
         cart_item.save()
         message = 'Cart updated'
+    request.cart.invalidate()
     
     if request.content_type == 'application/json':
         return JsonResponse({'success': True, 'message': message})
@@ -149,14 +148,12 @@ def remove_from_cart(request):
     else:
         cart_item_id = request.POST.get('cart_item_id')
     
-    if request.user.is_authenticated:
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, user=request.user)
-    else:
-        session_key = request.session.session_key
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, session_key=session_key)
+    cart_item = get_object_or_404(request.cart.get_queryset().select_related('product'), id=cart_item_id)
     
     product_name = cart_item.product.name
     cart_item.delete()
+    holds.release(request.cart.get_hold_owner(), [cart_item.product_id])
+    request.cart.invalidate()
     
     if request.content_type == 'application/json':
         return JsonResponse({
@@ -168,87 +165,45 @@ def remove_from_cart(request):
     return redirect('cart:cart_detail')
 
 def clear_cart(request):
-    try:
-        if request.user.is_authenticated:
-            CartItem.objects.filter(user=request.user).delete()
-        else:
-            session_key = request.session.session_key
-            if session_key:
-                CartItem.objects.filter(session_key=session_key).delete()
-        messages.success(request, 'Cart cleared successfully')
-        return redirect('cart_detail')
-    except Exception as e:
-        messages.error(request, 'Error clearing cart')
-        return redirect('cart_detail')
-
-
-@require_POST
-def update_cart(request):
-    if request.content_type == 'application/json':
-        data = json.loads(request.body)
-        cart_item_id = data.get('cart_item_id')
-        quantity = int(data.get('quantity', 1))
-    else:
-        cart_item_id = request.POST.get('cart_item_id')
-        quantity = int(request.POST.get('quantity', 1))
-    
-    if request.user.is_authenticated:
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, user=request.user)
-    else:
-        session_key = request.session.session_key
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, session_key=session_key)
-    
-    if quantity > cart_item.product.stock:
-        if request.content_type == 'application/json':
-            return JsonResponse({
-                'success': False,
-                'message': f'Only {cart_item.product.stock} items available'
-            })
-        messages.error(request, f'Only {cart_item.product.stock} items available')
-        return redirect('cart:cart_detail')
-    
-    if quantity <= 0:
-        cart_item.delete()
-        message = 'Item removed from cart'
-    else:
-        cart_item.quantity = quantity
-        cart_item.save()
-        message = 'Cart updated'
-    
-    if request.content_type == 'application/json':
-        return JsonResponse({'success': True, 'message': message})
-    
-    messages.success(request, message)
+    request.cart.get_queryset().delete()
+    owner = request.cart.get_hold_owner()
+    if owner:
+        holds.release(owner)
+    request.cart.invalidate()
+    messages.success(request, 'Cart cleared')
     return redirect('cart:cart_detail')
 
 @require_POST
-def remove_from_cart(request):
-    if request.content_type == 'application/json':
+def cart_batch(request):
+    """Apply a JSON list of add/set/remove operations and return the new cart."""
+    try:
         data = json.loads(request.body)
-        cart_item_id = data.get('cart_item_id')
-    else:
-        cart_item_id = request.POST.get('cart_item_id')
-    
-    if request.user.is_authenticated:
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, user=request.user)
-    else:
-        session_key = request.session.session_key
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, session_key=session_key)
-    
-    product_name = cart_item.product.name
-    cart_item.delete()
-    
-    if request.content_type == 'application/json':
+        operations = parse_operations(data.get('operations') if isinstance(data, dict) else None)
+        request.cart.apply(operations)
+    except ValueError as e:
+        # CartOperationError, and JSON decode errors, are both ValueErrors
         return JsonResponse({
-            'success': True,
-            'message': f'{product_name} removed from cart'
-        })
-    
-    messages.success(request, f'{product_name} removed from cart')
-    return redirect('cart:cart_detail')
+            'success': False,
+            'message': str(e),
+            'index': getattr(e, 'index', None),
+        }, status=400)
 
-def clear_cart(request):
-    cart_items = get_cart_items(request)
-    cart_items.delete()
-    messages.success(request, 'Cart cleared')
-    return redirect('cart:cart_detail')
+    cart = request.cart
+    # Loading the lines first lets the count and total come from them
+    items = cart.items
+    return JsonResponse({
+        'success': True,
+        'cart_count': cart.count,
+        'cart_total': str(cart.total),
+        'items': [
+            {
+                'id': item.id,
+                'product_id': item.product_id,
+                'name': item.product.name,
+                'price': str(item.product.price),
+                'quantity': item.quantity,
+                'total': str(item.total_price),
+            }
+            for item in items
+        ],
+    })
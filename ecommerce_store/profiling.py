@@ -0,0 +1,183 @@
+# ecommerce_store/profiling.py
+"""
+Per-request profiling: SQL query count and time, template render time and
+total latency for every view.
+
+``ProfilingMiddleware`` measures each request, adds a ``Server-Timing``
+header, writes one JSON log line to the ``ecommerce_store.profiling`` logger
+and folds the numbers into in-process per-view statistics, which
+``metrics_view`` serves as JSON. Template time is measured by the
+``ProfilingDjangoTemplates`` backend and includes any queries run lazily
+while rendering. Views over their budget in
+``settings.QUERY_BUDGETS`` are logged as warnings.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, JsonResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('ecommerce_store.profiling')
+
+_current = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - start
+
+
+class ViewStats:
+    """Running totals for one view plus a window of recent latencies."""
+
+    def __init__(self, window):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def add(self, profile, total_time):
+        self.requests += 1
+        self.queries += profile.queries
+        self.max_queries = max(self.max_queries, profile.queries)
+        self.query_time += profile.query_time
+        self.template_time += profile.template_time
+        self.total_time += total_time
+        self.latencies.append(total_time)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+    def as_dict(self):
+        ms = 1000 / self.requests
+        return {
+            'requests': self.requests,
+            'avg_queries': round(self.queries / self.requests, 2),
+            'max_queries': self.max_queries,
+            'avg_query_ms': round(self.query_time * ms, 2),
+            'avg_template_ms': round(self.template_time * ms, 2),
+            'avg_total_ms': round(self.total_time * ms, 2),
+            'p50_ms': round(self.percentile(0.50) * 1000, 2),
+            'p95_ms': round(self.percentile(0.95) * 1000, 2),
+            'p99_ms': round(self.percentile(0.99) * 1000, 2),
+        }
+
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: ViewStats(getattr(settings, 'PROFILING_LATENCY_WINDOW', 1000)))
+
+
+def get_stats():
+    with _stats_lock:
+        return {view: stats.as_dict() for view, stats in sorted(_stats.items())}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def get_query_budget(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_time = time.perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        if view_name == 'metrics':
+            return response
+
+        with _stats_lock:
+            _stats[view_name].add(profile, total_time)
+
+        response['Server-Timing'] = (
+            f'db;dur={profile.query_time * 1000:.1f};desc="{profile.queries} queries", '
+            f'tpl;dur={profile.template_time * 1000:.1f}, '
+            f'total;dur={total_time * 1000:.1f}'
+        )
+
+        budget = get_query_budget(view_name)
+        over_budget = budget is not None and profile.queries > budget
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps({
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'query_budget': budget,
+            'query_ms': round(profile.query_time * 1000, 2),
+            'template_ms': round(profile.template_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+        }))
+        return response
+
+
+class ProfilingTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - start
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, timing every top-level render."""
+
+    def from_string(self, template_code):
+        return ProfilingTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfilingTemplate(template.template, self)
+
+
+def metrics_view(request):
+    """Per-view profiling statistics, for staff only."""
+    # Not by client address: behind a local proxy every visitor is 127.0.0.1
+    if not request.user.is_staff:
+        raise Http404
+    return JsonResponse({'views': get_stats()})
@@ -0,0 +1,131 @@
+# ecommerce_store/replicas.py
+"""
+Read replicas for storefront browsing and admin reports.
+
+``settings.DATABASE_REPLICAS`` lists the ``DATABASES`` aliases that are
+read-only copies of ``default``. ``ReplicaRoutingMiddleware`` decides per
+request whether reads may go to one of them: only GET and HEAD requests for
+views in ``REPLICA_VIEW_MODULES`` or named in ``REPLICA_VIEWS`` do. Cart,
+checkout, accounts, sessions and anything outside a request (management
+commands, signals run from them) always read from the primary.
+
+Writes always go to the primary, and the first one pins the rest of the
+request there, so it reads back what it just wrote. A request that wrote
+also sets a short-lived cookie pinning the same browser's next requests
+for ``REPLICA_PIN_SECONDS``, long enough to cover replication lag on the
+page a POST redirects to. Likewise ``store.cache`` renders a storefront
+page from the primary when its catalogue data changed that recently, so a
+replica's older copy never goes into the page cache.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_pin'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_current = ContextVar('replica_routing', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.replica = None
+        self.pinned = pinned
+        self.wrote = False
+
+
+def pin_to_primary():
+    """Read from the primary for the rest of the current request."""
+    state = _current.get()
+    if state is not None:
+        state.pinned = True
+
+
+def reads_from_replica(request, view_func):
+    """Whether ``view_func`` only reads, so may use a replica for ``request``."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    match = request.resolver_match
+    return (
+        view_func.__module__ in getattr(settings, 'REPLICA_VIEW_MODULES', ())
+        or (match is not None and match.view_name in getattr(settings, 'REPLICA_VIEWS', ()))
+    )
+
+
+def _streamed(state, content):
+    # Streamed bodies (the order export) run their queries after the view
+    # has returned, so route them the same way chunk by chunk
+    content = iter(content)
+    while True:
+        token = _current.set(state)
+        try:
+            chunk = next(content)
+        except StopIteration:
+            return
+        finally:
+            _current.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        if response.streaming:
+            response.streaming_content = _streamed(state, response.streaming_content)
+        if state.wrote and get_replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _current.get()
+        replicas = get_replicas()
+        if state is not None and replicas and reads_from_replica(request, view_func):
+            # One replica for the whole request, so its reads are consistent
+            state.replica = random.choice(replicas)
+
+
+class ReplicaRouter:
+    """Send reads to the request's replica, if it has one and has not written."""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or state.pinned or state.replica is None:
+            return DEFAULT_DB_ALIAS
+        # A session not replicated yet would look empty, and SessionMiddleware
+        # then deletes the visitor's cookie along with their cart
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication from the primary
+        return db not in get_replicas()
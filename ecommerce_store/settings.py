@@ -1,4 +1,5 @@
 # ecommerce_store/settings.py
+import importlib.util
 import os
 from pathlib import Path
 
@@ -24,11 +25,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ecommerce_store.profiling.ProfilingMiddleware',
+    'ecommerce_store.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.middleware.CartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -37,7 +41,7 @@ ROOT_URLCONF = 'ecommerce_store.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'ecommerce_store.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -54,12 +58,73 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ecommerce_store.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE picks the database: 'sqlite' (default) or 'postgresql'.
+# SQLite runs through ecommerce_store.sqlite3, which waits for the write
+# lock instead of raising "database is locked"; see there. With several
+# workers, run `manage.py enable_wal` once on the database file.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'buyeezy'),
+            'USER': os.environ.get('DB_USER', 'buyeezy'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Keep each worker's connection open between requests, and
+            # check it is still alive before a request reuses it
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
     }
+    # Pooling is done by PgBouncer in front of PostgreSQL. In transaction
+    # mode it cannot keep a server-side cursor across statements, so the
+    # iterator() exports fetch client-side instead.
+    if os.environ.get('DB_POOLER') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'ecommerce_store.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '0')),
+            'OPTIONS': {
+                'pragmas': {
+                    'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT', '5000')),
+                },
+            },
+        }
+    }
+
+# Read replicas (ecommerce_store.replicas): DB_REPLICAS lists them, comma
+# separated, as SQLite files or as PostgreSQL hosts sharing the primary's
+# credentials. Storefront pages and admin reports read from one of them.
+# To try it locally, copy the database with sqlite3's backup, which unlike
+# cp includes any writes still in db.sqlite3-wal:
+#   sqlite3 db.sqlite3 ".backup db-replica.sqlite3"
+# then run with DB_REPLICAS=db-replica.sqlite3 (back up again to "replicate").
+DATABASE_REPLICAS = []
+for number, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DB_ENGINE == 'postgresql':
+        DATABASES[alias]['HOST'] = replica.strip()
+    else:
+        DATABASES[alias]['NAME'] = BASE_DIR / replica.strip()
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['ecommerce_store.replicas.ReplicaRouter']
+REPLICA_VIEW_MODULES = {'store.views'}
+REPLICA_VIEWS = {
+    'admin_panel:dashboard', 'admin_panel:orders', 'admin_panel:orders_export', 'admin_panel:users',
 }
+# How long a browser keeps reading from the primary after it wrote; should
+# exceed the replicas' lag
+REPLICA_PIN_SECONDS = 5
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -86,10 +151,34 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed copies of every asset, plus .gz/.br
+# versions, so they can be cached as immutable. Off by default under DEBUG,
+# where runserver serves the source files directly.
+STATIC_MANIFEST = os.environ.get('STATIC_MANIFEST', '0' if DEBUG else '1') == '1'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'ecommerce_store.storage.CompressedManifestStaticFilesStorage'
+        if STATIC_MANIFEST else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# WhiteNoise, when installed, serves STATIC_ROOT itself: the precompressed
+# files on Accept-Encoding, and hashed names with an immutable, year-long
+# Cache-Control. Without it, point the front-end server at STATIC_ROOT.
+if importlib.util.find_spec('whitenoise'):
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product image thumbnails (store.images): generated on a background thread
+# after upload unless IMAGE_VARIANTS_ASYNC is off
+IMAGE_VARIANTS_ASYNC = True
+IMAGE_VARIANT_WORKERS = 2
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Login URLs
@@ -97,5 +186,80 @@ LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'store:home'
 LOGOUT_REDIRECT_URL = 'store:home'
 
-# Session configuration for cart
-SESSION_COOKIE_AGE = 86400  # 24 hours
\ No newline at end of file
+# Cache: local memory by default. Multi-node deployments should point
+# CACHE_BACKEND/CACHE_LOCATION at a shared store, for example
+# django.core.cache.backends.redis.RedisCache with redis://host:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'buyeezy'),
+    }
+}
+
+# Storefront page cache (store.cache)
+STOREFRONT_CACHE_ALIAS = 'default'
+STOREFRONT_CACHE_TIMEOUT = 600  # 10 minutes
+
+# Listings paginated by keyset cursor instead of page number/OFFSET
+CURSOR_PAGINATED_LISTINGS = {
+    'product_list', 'category_detail',
+    'admin_products', 'admin_orders', 'admin_users',
+    'order_history',
+}
+# Cursor listings that also show a total, cached for a short while
+CURSOR_PAGINATION_COUNTS = CURSOR_PAGINATED_LISTINGS - {'order_history'}
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# Request profiling (ecommerce_store.profiling): per-view query counts and
+# timings in the logs, Server-Timing headers and /_metrics/ (staff only).
+# Off by default outside DEBUG.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1' if DEBUG else '0') == '1'
+PROFILING_LATENCY_WINDOW = 1000  # recent requests kept per view for percentiles
+
+# Most SQL queries a view may run; exceeding it logs a warning and fails
+# the view's query budget test
+QUERY_BUDGETS = {
+    'store:home': 9,
+    'store:product_list': 9,
+    'store:product_detail': 8,
+    'store:category': 9,
+    'cart:cart_detail': 6,
+    'cart:add_to_cart': 10,
+    'cart:cart_batch': 16,
+    'orders:checkout': 18,
+    'orders:order_detail': 10,
+    'orders:order_history': 7,
+    'accounts:profile': 6,
+    'admin_panel:dashboard': 14,
+    'admin_panel:products': 9,
+    'admin_panel:orders': 8,
+    'admin_panel:order_detail': 10,
+    'admin_panel:users': 8,
+    'admin_panel:categories': 7,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ecommerce_store.profiling': {
+            'handlers': ['console'],
+            # WARNING logs only views over budget; INFO logs every request
+            'level': os.environ.get('PROFILING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Session configuration for cart. Sessions are read from the cache and only
+# fall back to the database on a miss; anonymous visitors get one only when
+# they first add to the cart. Run purge_sessions periodically to drop expired
+# sessions along with their abandoned cart lines.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_COOKIE_AGE = 86400  # 24 hours
+
+# How long adding to cart or opening checkout reserves the units (cart.holds)
+STOCK_HOLD_SECONDS = 15 * 60
\ No newline at end of file
@@ -0,0 +1,49 @@
+# ecommerce_store/sqlite3/base.py
+"""
+SQLite backend tuned for several web workers writing to one file.
+
+Every new connection applies the pragmas in ``OPTIONS`` and waits for a
+busy database (``busy_timeout``) instead of failing at once. Write-ahead
+logging, which stops readers from blocking the writer or each other, is a
+property of the database file rather than of a connection: it is turned on
+once with ``manage.py enable_wal``, not on every connect, which would
+silently convert whatever file ``DB_NAME`` points at. Connections to a WAL
+database also relax ``synchronous`` to NORMAL, which is only safe there.
+
+Transactions start with a deferred ``BEGIN``, so read-only ones never
+queue for the write lock. Blocks that read and then write use
+``ecommerce_store.transactions.write_transaction``, which begins with
+``BEGIN IMMEDIATE`` instead.
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 128 * 1024 * 1024,
+}
+# Only the last commits can be lost on power failure, and only with WAL
+WAL_PRAGMAS = {
+    'synchronous': 'NORMAL',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    transaction_mode = 'DEFERRED'
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.transaction_mode = kwargs.pop('transaction_mode', 'DEFERRED')
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.pragmas
+        if conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            pragmas = {**WAL_PRAGMAS, **pragmas}
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,43 @@
+# ecommerce_store/testing.py
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for holding views to their ``settings.QUERY_BUDGETS``.
+
+    ``assertWithinQueryBudget`` requests a URL and fails, listing every
+    query, when the view runs more SQL than its declared budget. The cache
+    is cleared first so a cached page can never hide the real cost.
+    """
+
+    def assertWithinQueryBudget(self, path, method='get', data=None, budget=None, **extra):
+        view_name = resolve(path.split('?')[0]).view_name
+        if budget is None:
+            budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None:
+            self.fail(f'No query budget declared for {view_name}')
+
+        cache.clear()
+        # Record statements the same way ProfilingMiddleware counts them
+        # on every connection, replicas included
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(f'[{context["connection"].alias}] {sql}')
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            response = getattr(self.client, method)(path, data, **extra)
+
+        if len(queries) > budget:
+            listing = '\n'.join(f'{number}. {sql}' for number, sql in enumerate(queries, 1))
+            self.fail(f'{view_name} ran {len(queries)} queries, over its budget of {budget}:\n{listing}')
+        return response
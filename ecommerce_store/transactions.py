@@ -0,0 +1,36 @@
+# ecommerce_store/transactions.py
+"""
+Transactions for blocks that read before they write.
+
+On SQLite a deferred transaction that has read cannot become the writer
+once another connection has written: it fails with "database is locked"
+at once, whatever ``busy_timeout`` says. ``write_transaction`` is
+``transaction.atomic`` for such blocks (checkout, cart changes holding
+stock): on ecommerce_store.sqlite3 it begins with ``BEGIN IMMEDIATE``, so
+it waits for the write lock up front. Everything else keeps the deferred
+``BEGIN``, under which read-only transactions never wait for writers.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+@contextmanager
+def write_transaction(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if not hasattr(connection, 'transaction_mode') or connection.in_atomic_block:
+        # Another backend, or inside a transaction that has already begun
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Connecting resets transaction_mode from the settings, so connect first
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
@@ -3,6 +3,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .profiling import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,6 +12,7 @@ urlpatterns = [
     path('cart/', include('cart.urls', namespace='cart')),
     path('accounts/', include('accounts.urls')),
     path('orders/', include('orders.urls')),
+    path('_metrics/', metrics_view, name='metrics'),
 ]
 
 # Serve media files during development
@@ -0,0 +1,78 @@
+# orders/checkout.py
+from django.db import transaction
+from django.db.models import Case, When, F, Value, PositiveIntegerField
+from cart import holds
+from ecommerce_store.transactions import write_transaction
+from store.cache import bump, CATALOGUE_NAMESPACE, product_namespace
+from store.models import Product
+from .models import OrderItem
+from . import rollups
+from .summary import summarize
+
+
+class OutOfStockError(Exception):
+    """Raised when a cart line asks for more units than are left in stock."""
+
+
+@write_transaction()
+def place_order(order, cart):
+    """
+    Save ``order`` with one OrderItem per cart line, take the units out of
+    stock and empty the cart.
+
+    The number of queries does not depend on the number of cart lines:
+    products come with the cart's lines, already loaded to price the order,
+    order items are bulk inserted and stock is decremented by a single
+    conditional UPDATE, which only touches products that still have enough
+    units left. That UPDATE, not the stock read with the lines, is what
+    guarantees nothing is oversold.
+    """
+    quantities = {item.product_id: item.quantity for item in cart.items}
+    products = {item.product_id: item.product for item in cart.items}
+
+    short = [
+        products[product_id].name
+        for product_id, quantity in quantities.items()
+        if products[product_id].stock < quantity
+    ]
+    if short:
+        raise OutOfStockError(f'Insufficient stock for {", ".join(short)}')
+
+    for field, value in summarize(
+        (products[product_id], quantity) for product_id, quantity in quantities.items()
+    ).items():
+        setattr(order, field, value)
+    order.save()
+    items = OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=products[product_id],
+            quantity=quantity,
+            price=products[product_id].price,
+        )
+        for product_id, quantity in quantities.items()
+    ])
+    # bulk_create skips post_save, so the sales rollup is fed directly
+    rollups.record_items(items)
+
+    required = Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=PositiveIntegerField(),
+    )
+    updated = Product.objects.filter(
+        pk__in=list(quantities), stock__gte=required
+    ).update(stock=F('stock') - required)
+    if updated != len(quantities):
+        # Another checkout took the last units between our read and the update
+        raise OutOfStockError('Insufficient stock for one or more items in your cart')
+
+    # Product pages show the stock level; listings only whether it is sold out
+    stale = [product_namespace(product.slug) for product in products.values()]
+    if any(products[product_id].stock == quantity for product_id, quantity in quantities.items()):
+        stale.append(CATALOGUE_NAMESPACE)
+    transaction.on_commit(lambda: bump(*stale))
+
+    cart.get_queryset().delete()
+    holds.release(cart.get_hold_owner())
+    cart.invalidate()
+    return order
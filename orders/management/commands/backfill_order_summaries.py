@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from orders.models import Order
+from orders.summary import refresh_summaries
+
+class Command(BaseCommand):
+    help = 'Fill in the item count, unit count and preview of orders placed before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every order, not only those without a summary')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by('pk')
+        if not options['all']:
+            orders = orders.filter(item_count=0)
+
+        # Walk by primary key so each batch is a fresh, short query
+        done, last_pk = 0, 0
+        while True:
+            batch = list(orders.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            refresh_summaries(batch)
+            done += len(batch)
+            last_pk = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f'Summarized {done} orders'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from orders.models import DailySales, OrderStatusCount, ProductSales
+from orders.rollups import rebuild
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard sales rollups from the order history'
+
+    def handle(self, *args, **kwargs):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {DailySales.objects.count()} days, '
+            f'{OrderStatusCount.objects.count()} statuses and '
+            f'{ProductSales.objects.count()} products'
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:21
+
+from django.db import migrations, models
+
+
+def blank_order_ids_to_null(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(order_id='').update(order_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_user_related_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='order_id',
+            field=models.CharField(default=None, editable=False, max_length=20, null=True, unique=True),
+        ),
+        migrations.RunPython(blank_order_ids_to_null, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:32
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailySales = apps.get_model('orders', 'DailySales')
+    OrderStatusCount = apps.get_model('orders', 'OrderStatusCount')
+    ProductSales = apps.get_model('orders', 'ProductSales')
+
+    DailySales.objects.bulk_create([
+        DailySales(date=row['day'], order_count=row['orders'], revenue=row['revenue'])
+        for row in Order.objects.annotate(day=TruncDate('created_at'))
+        .values('day').annotate(orders=Count('id'), revenue=Sum('total_amount'))
+        .order_by()
+    ])
+    OrderStatusCount.objects.bulk_create([
+        OrderStatusCount(status=row['status'], count=row['orders'])
+        for row in Order.objects.values('status').annotate(orders=Count('id')).order_by()
+    ])
+    ProductSales.objects.bulk_create([
+        ProductSales(product_id=row['product'], units=row['units'], revenue=row['revenue'])
+        for row in OrderItem.objects.values('product').annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('price'), output_field=DecimalField()),
+        ).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_category_tree'),
+        ('orders', '0004_order_id_from_pk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'daily sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales', serialize=False, to='store.product')),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'product sales',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='orders_orde_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productsales',
+            index=models.Index(fields=['-units'], name='orders_prod_units_idx'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
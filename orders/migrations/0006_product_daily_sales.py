@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:33
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_product_daily_sales(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    ProductDailySales = apps.get_model('orders', 'ProductDailySales')
+    ProductDailySales.objects.bulk_create([
+        ProductDailySales(
+            date=row['day'], product_id=row['product'],
+            units=row['units'], revenue=row['revenue']
+        )
+        for row in OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product').annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('price'), output_field=DecimalField()),
+        ).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_category_tree'),
+        ('orders', '0005_order_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'product daily sales',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productdailysales',
+            constraint=models.UniqueConstraint(fields=('date', 'product'), name='orders_prod_daily_uniq'),
+        ),
+        migrations.RunPython(backfill_product_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:02
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_order_ids(apps, schema_editor):
+    # Orders saved before order_id came from the primary key; the order
+    # history page used to fill these in on every visit
+    Order = apps.get_model('orders', 'Order')
+    missing = Order.objects.filter(order_id__isnull=True).order_by('pk')
+    while True:
+        orders = list(missing.only('pk')[:BATCH_SIZE])
+        if not orders:
+            break
+        for order in orders:
+            order.order_id = f'ORD{order.pk:06d}'
+        Order.objects.bulk_update(orders, ['order_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_product_daily_sales'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_ids, migrations.RunPython.noop),
+    ]
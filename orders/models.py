@@ -18,8 +18,8 @@ class Order(models.Model):
         ('cod', 'Cash on Delivery'),
     )
     
-    order_id = models.CharField(max_length=20, unique=True, default='', editable=False)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    order_id = models.CharField(max_length=20, unique=True, null=True, default=None, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     email = models.EmailField()
@@ -34,15 +34,38 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Copied from the lines at checkout (orders.summary) so order lists can
+    # show what was bought without reading OrderItem or Product
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    unit_count = models.PositiveIntegerField(default=0, editable=False)
+    preview = models.JSONField(default=list, blank=True, editable=False)
+
+    @staticmethod
+    def format_order_id(pk):
+        return f'ORD{pk:06d}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='orders_orde_created_idx'),
+            # Order history and the admin status filter, in listing order
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_order_user_new_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='orders_order_status_new_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # Remember the stored status so rollups can tell when it changes
+        order._saved_status = order.__dict__.get('status')
+        return order
+
     def save(self, *args, **kwargs):
-        if not self.order_id:
-            last_order = Order.objects.all().order_by('-id').first()
-            if last_order:
-                last_id = int(last_order.order_id[3:])
-                self.order_id = f'ORD{str(last_id + 1).zfill(6)}'
-            else:
-                self.order_id = 'ORD000001'
         super().save(*args, **kwargs)
+        # The order number comes from the primary key, which the database
+        # allocates atomically, so concurrent checkouts can never collide.
+        if not self.order_id:
+            self.order_id = self.format_order_id(self.pk)
+            Order.objects.filter(pk=self.pk).update(order_id=self.order_id)
 
     def __str__(self):
         return f"Order #{self.order_id} by {self.user.username}"
@@ -55,3 +78,57 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name} in Order #{self.order.id}"
+
+
+class DailySales(models.Model):
+    """Orders placed and revenue per day, kept up to date by ``orders.rollups``."""
+    date = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return f"{self.date}: {self.order_count} orders, ${self.revenue}"
+
+class OrderStatusCount(models.Model):
+    """Number of orders currently in each status, kept up to date by ``orders.rollups``."""
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS, unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+class ProductSales(models.Model):
+    """Units sold and revenue per product, kept up to date by ``orders.rollups``."""
+    product = models.OneToOneField(
+        'store.Product', primary_key=True, related_name='sales', on_delete=models.CASCADE
+    )
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'product sales'
+        indexes = [
+            models.Index(fields=['-units'], name='orders_prod_units_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.units} units"
+
+class ProductDailySales(models.Model):
+    """Units sold and revenue per product per day, kept up to date by ``orders.rollups``."""
+    date = models.DateField()
+    product = models.ForeignKey('store.Product', related_name='daily_sales', on_delete=models.CASCADE)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'product daily sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='orders_prod_daily_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.product_id}: {self.units} units"
@@ -0,0 +1,48 @@
+# orders/rankings.py
+"""
+Best-selling products over a time window, read from the sales rollups.
+
+``all`` reads ``ProductSales`` through its units index; the dated windows
+sum at most 30 ``ProductDailySales`` rows per product, found through the
+(date, product) index. Either way it is one query that never touches the
+order lines themselves.
+"""
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+from store.models import Product
+
+WINDOWS = {
+    'today': ('Today', 1),
+    '7d': ('Last 7 days', 7),
+    '30d': ('Last 30 days', 30),
+    'all': ('All time', None),
+}
+DEFAULT_WINDOW = '30d'
+
+
+def top_products(window=DEFAULT_WINDOW, limit=5, available_only=False):
+    """
+    Return up to ``limit`` products ordered by units sold in ``window``,
+    each annotated with ``units_sold`` and ``sales_revenue``.
+    """
+    if window not in WINDOWS:
+        window = DEFAULT_WINDOW
+    days = WINDOWS[window][1]
+
+    products = Product.objects.select_related('category')
+    if available_only:
+        products = products.filter(available=True)
+
+    if days is None:
+        products = products.filter(sales__units__gt=0).annotate(
+            units_sold=F('sales__units'), sales_revenue=F('sales__revenue')
+        )
+    else:
+        since = timezone.localdate() - timedelta(days=days - 1)
+        products = products.filter(daily_sales__date__gte=since).annotate(
+            units_sold=Sum('daily_sales__units'), sales_revenue=Sum('daily_sales__revenue')
+        ).filter(units_sold__gt=0)
+
+    return list(products.order_by('-units_sold', 'name')[:limit])
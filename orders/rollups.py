@@ -0,0 +1,152 @@
+# orders/rollups.py
+"""
+Summary tables behind the admin dashboard.
+
+Every order placed, status change, deletion and order line adds a delta to
+``DailySales``, ``OrderStatusCount``, ``ProductSales`` and ``ProductDailySales``
+with a single ``INSERT ... ON CONFLICT DO UPDATE``. Concurrent checkouts
+therefore never lose an increment, and reading the dashboard costs the same
+however many orders there are. ``rebuild()`` recomputes everything from the order tables.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def _add(model, key_fields, rows):
+    """Add each row's counters to the matching summary row, creating it if needed."""
+    if not rows:
+        return
+    opts = model._meta
+    fields = [opts.get_field(name) for name in rows[0]]
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    keys = [connection.ops.quote_name(opts.get_field(name).column) for name in key_fields]
+    table = connection.ops.quote_name(opts.db_table)
+
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+    assignments = ', '.join(
+        f'{column} = {table}.{column} + excluded.{column}'
+        for column in columns if column not in keys
+    )
+    params = [
+        field.get_db_prep_save(row[field.name], connection)
+        for row in rows for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES {placeholders} '
+            f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {assignments}',
+            params
+        )
+
+
+def _subtract(model, key_fields, rows):
+    """
+    Take counters back out of existing summary rows.
+
+    Removals never create rows: a row that is gone (say, because its product
+    is being deleted in the same cascade) has nothing left to subtract from.
+    """
+    for row in rows:
+        model.objects.filter(**{name: row[name] for name in key_fields}).update(**{
+            name: F(name) - value for name, value in row.items() if name not in key_fields
+        })
+
+
+def record_order(order, sign=1):
+    """Count a newly placed order (or take a deleted one back out with ``sign=-1``)."""
+    from .models import DailySales, OrderStatusCount
+
+    apply = _add if sign > 0 else _subtract
+    apply(DailySales, ['date'], [{
+        'date': timezone.localdate(order.created_at),
+        'order_count': 1,
+        'revenue': order.total_amount,
+    }])
+    apply(OrderStatusCount, ['status'], [{'status': order.status, 'count': 1}])
+
+
+def record_status_change(old_status, new_status):
+    """Move one order from ``old_status`` to ``new_status``."""
+    from .models import OrderStatusCount
+
+    _add(OrderStatusCount, ['status'], [
+        {'status': old_status, 'count': -1},
+        {'status': new_status, 'count': 1},
+    ])
+
+
+def record_items(items, sign=1):
+    """Add the units and revenue of order lines to their products' totals."""
+    from .models import ProductSales, ProductDailySales
+
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for item in items:
+        day = timezone.localdate(item.order.created_at)
+        totals[day, item.product_id][0] += item.quantity
+        totals[day, item.product_id][1] += item.quantity * item.price
+
+    per_product = defaultdict(lambda: [0, Decimal('0')])
+    for (day, product_id), (units, revenue) in totals.items():
+        per_product[product_id][0] += units
+        per_product[product_id][1] += revenue
+
+    apply = _add if sign > 0 else _subtract
+    apply(ProductSales, ['product'], [
+        {'product': product_id, 'units': units, 'revenue': revenue}
+        for product_id, (units, revenue) in sorted(per_product.items())
+    ])
+    apply(ProductDailySales, ['date', 'product'], [
+        {'date': day, 'product': product_id, 'units': units, 'revenue': revenue}
+        for (day, product_id), (units, revenue) in sorted(totals.items())
+    ])
+
+
+@transaction.atomic
+def rebuild(apps=global_apps):
+    """Recompute every summary table from orders and order lines."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailySales = apps.get_model('orders', 'DailySales')
+    OrderStatusCount = apps.get_model('orders', 'OrderStatusCount')
+    ProductSales = apps.get_model('orders', 'ProductSales')
+    ProductDailySales = apps.get_model('orders', 'ProductDailySales')
+
+    DailySales.objects.all().delete()
+    OrderStatusCount.objects.all().delete()
+    ProductSales.objects.all().delete()
+    ProductDailySales.objects.all().delete()
+
+    DailySales.objects.bulk_create([
+        DailySales(date=row['day'], order_count=row['orders'], revenue=row['revenue'])
+        for row in Order.objects.annotate(day=TruncDate('created_at'))
+        .values('day').annotate(orders=Count('id'), revenue=Sum('total_amount'))
+        .order_by()
+    ])
+    OrderStatusCount.objects.bulk_create([
+        OrderStatusCount(status=row['status'], count=row['orders'])
+        for row in Order.objects.values('status').annotate(orders=Count('id')).order_by()
+    ])
+    ProductSales.objects.bulk_create([
+        ProductSales(product_id=row['product'], units=row['units'], revenue=row['revenue'])
+        for row in OrderItem.objects.values('product').annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('price'), output_field=DecimalField()),
+        ).order_by()
+    ])
+    ProductDailySales.objects.bulk_create([
+        ProductDailySales(
+            date=row['day'], product_id=row['product'],
+            units=row['units'], revenue=row['revenue']
+        )
+        for row in OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product').annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('price'), output_field=DecimalField()),
+        ).order_by()
+    ])
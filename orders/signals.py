@@ -0,0 +1,32 @@
+# orders/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Order, OrderItem
+from . import rollups
+from .summary import refresh_summaries
+
+@receiver(post_save, sender=Order)
+def roll_up_order(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_saved_status', None)
+    if created:
+        rollups.record_order(instance)
+    elif previous and previous != instance.status:
+        rollups.record_status_change(previous, instance.status)
+    instance._saved_status = instance.status
+
+@receiver(post_delete, sender=Order)
+def roll_back_order(sender, instance, **kwargs):
+    instance.status = getattr(instance, '_saved_status', None) or instance.status
+    rollups.record_order(instance, sign=-1)
+
+# Checkout bulk inserts its lines and records them itself
+@receiver(post_save, sender=OrderItem)
+def roll_up_order_item(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_items([instance])
+    refresh_summaries([instance.order_id])
+
+@receiver(post_delete, sender=OrderItem)
+def roll_back_order_item(sender, instance, **kwargs):
+    rollups.record_items([instance], sign=-1)
+    refresh_summaries([instance.order_id])
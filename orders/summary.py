@@ -0,0 +1,53 @@
+# orders/summary.py
+"""
+Denormalized order summaries.
+
+``Order.item_count``, ``unit_count`` and ``preview`` (the first few lines'
+product name, slug, quantity and thumbnail URL) are filled in by checkout
+from the lines it is writing, so order lists read the order table alone.
+Lines saved or deleted one at a time, e.g. from the Django admin, refresh
+their order through signals; ``refresh_summaries`` recomputes any set of
+orders and backs the ``backfill_order_summaries`` command.
+"""
+from collections import defaultdict
+
+from store.images import image_url
+from .models import Order, OrderItem
+
+PREVIEW_LINES = 3
+
+
+def summarize(lines):
+    """Summary fields for ``(product, quantity)`` pairs, in display order."""
+    lines = list(lines)
+    return {
+        'item_count': len(lines),
+        'unit_count': sum(quantity for _, quantity in lines),
+        'preview': [
+            {
+                'product_id': product.pk,
+                'name': product.name,
+                'slug': product.slug,
+                'quantity': quantity,
+                'thumb': image_url(product, 'thumb'),
+            }
+            for product, quantity in lines[:PREVIEW_LINES]
+        ],
+    }
+
+
+def refresh_summaries(order_ids):
+    """Recompute the summary fields of ``order_ids`` from their lines."""
+    order_ids = list(order_ids)
+    lines = defaultdict(list)
+    items = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .select_related('product')
+        .order_by('order_id', 'id')
+    )
+    for item in items:
+        lines[item.order_id].append((item.product, item.quantity))
+    Order.objects.bulk_update(
+        [Order(pk=pk, **summarize(lines[pk])) for pk in order_ids],
+        ['item_count', 'unit_count', 'preview'],
+    )
@@ -0,0 +1,330 @@
+import csv
+import io
+import os
+import tempfile
+import threading
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections, transaction, OperationalError
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.utils.html import escape
+from cart.models import CartItem
+from ecommerce_store.testing import QueryBudgetMixin
+from ecommerce_store.transactions import write_transaction
+from store.models import Category, Product
+from .models import Order, OrderItem, DailySales, OrderStatusCount, ProductSales, ProductDailySales
+from .rankings import top_products
+from .summary import refresh_summaries
+from . import rollups
+
+CHECKOUT_DATA = {
+    'first_name': 'Test',
+    'last_name': 'User',
+    'email': 'test@example.com',
+    'phone': '5550100',
+    'address': '1 Test Street',
+    'city': 'Testville',
+    'state': 'TS',
+    'postal_code': '12345',
+    'payment_method': 'cod',
+}
+
+
+class OrderIdTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+
+    def create_order(self):
+        return Order.objects.create(user=self.user, total_amount=10, **CHECKOUT_DATA)
+
+    def test_order_id_is_derived_from_primary_key(self):
+        order = self.create_order()
+        self.assertEqual(order.order_id, f'ORD{order.pk:06d}')
+        order.refresh_from_db()
+        self.assertEqual(order.order_id, f'ORD{order.pk:06d}')
+
+    def test_order_id_does_not_read_previous_orders(self):
+        self.create_order()
+        # INSERT, the order_id UPDATE and the two order rollup upserts;
+        # no SELECT of the latest order
+        with self.assertNumQueries(4):
+            self.create_order()
+
+    def test_saving_again_keeps_order_id(self):
+        order = self.create_order()
+        order_id = order.order_id
+        order.status = 'shipped'
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.order_id, order_id)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Rollups', slug='rollups')
+        self.products = [
+            Product.objects.create(
+                name=f'Rollup {i}', slug=f'rollup-{i}', category=category,
+                description='Widget', price=10 + i, stock=100
+            )
+            for i in range(2)
+        ]
+        self.user = User.objects.create_user('roller', 'roller@example.com', 'pass12345')
+        self.client.force_login(self.user)
+
+    def checkout(self, quantities):
+        for product, quantity in zip(self.products, quantities):
+            CartItem.objects.create(user=self.user, product=product, quantity=quantity)
+        self.client.post('/orders/checkout/', CHECKOUT_DATA)
+
+    def snapshot(self):
+        return (
+            sorted(DailySales.objects.values_list('date', 'order_count', 'revenue')),
+            sorted(OrderStatusCount.objects.exclude(count=0).values_list('status', 'count')),
+            sorted(ProductSales.objects.exclude(units=0).values_list('product_id', 'units', 'revenue')),
+            sorted(ProductDailySales.objects.exclude(units=0).values_list(
+                'date', 'product_id', 'units', 'revenue'
+            )),
+        )
+
+    def test_incremental_rollups_match_rebuild(self):
+        self.checkout([1, 2])
+        self.checkout([3, 0])
+        self.checkout([0, 1])
+        first, second, third = Order.objects.order_by('pk')
+        second.status = 'shipped'
+        second.save()
+        third.delete()
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental[1], [('pending', 1), ('shipped', 1)])
+        self.assertEqual(
+            [(units, revenue) for _, units, revenue in incremental[2]],
+            [(4, 40), (2, 22)]
+        )
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_top_products_rank_by_units(self):
+        self.checkout([1, 3])
+        self.checkout([1, 0])
+        for window in ('today', '7d', '30d', 'all'):
+            with self.assertNumQueries(1):
+                ranking = top_products(window)
+            self.assertEqual(
+                [(product.pk, product.units_sold) for product in ranking],
+                [(self.products[1].pk, 3), (self.products[0].pk, 2)]
+            )
+
+
+class CheckoutQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Budget', slug='budget')
+        self.user = User.objects.create_user('budget', 'budget@example.com', 'pass12345')
+        self.client.force_login(self.user)
+        for i in range(6):
+            product = Product.objects.create(
+                name=f'Budget {i}', slug=f'budget-{i}', category=category,
+                description='Widget', price=10, stock=10
+            )
+            CartItem.objects.create(user=self.user, product=product, quantity=1)
+
+    def test_checkout(self):
+        self.assertWithinQueryBudget('/orders/checkout/')
+        response = self.assertWithinQueryBudget('/orders/checkout/', method='post', data=CHECKOUT_DATA)
+        order = Order.objects.get(user=self.user)
+        self.assertRedirects(response, f'/orders/success/{order.order_id}/', fetch_redirect_response=False)
+        self.assertEqual((order.item_count, order.unit_count), (6, 6))
+        self.assertEqual([line['slug'] for line in order.preview], ['budget-0', 'budget-1', 'budget-2'])
+        self.assertWithinQueryBudget(f'/orders/detail/{order.order_id}/')
+
+    def test_add_to_cart_then_checkout(self):
+        # The whole flow through the views, starting from an empty cart
+        CartItem.objects.all().delete()
+        for product in Product.objects.all()[:3]:
+            response = self.assertWithinQueryBudget(
+                '/cart/add/', method='post', data={'product_id': product.pk, 'quantity': 2}
+            )
+            self.assertTrue(response.json()['success'])
+        self.assertWithinQueryBudget(
+            '/cart/add/', method='post', data={'product_id': product.pk, 'quantity': 1}
+        )
+        response = self.assertWithinQueryBudget('/orders/checkout/', method='post', data=CHECKOUT_DATA)
+        order = Order.objects.get(user=self.user)
+        self.assertRedirects(response, f'/orders/success/{order.order_id}/', fetch_redirect_response=False)
+        self.assertEqual((order.item_count, order.unit_count), (3, 7))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_order_history(self):
+        products = list(Product.objects.all())
+        CartItem.objects.all().delete()
+        for i in range(200):
+            order = Order.objects.create(user=self.user, total_amount=10, **CHECKOUT_DATA)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price=10)
+                for product in products[:i % 5 + 1]
+            ])
+
+        refresh_summaries(Order.objects.values_list('pk', flat=True))
+
+        response = self.assertWithinQueryBudget('/orders/history/')
+        orders = list(response.context['orders'])
+        self.assertEqual(len(orders), 10)
+        self.assertEqual([order.item_count for order in orders[:5]], [5, 4, 3, 2, 1])
+        self.assertContains(response, 'and 2 more items')
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.has_next())
+        self.assertContains(response, f'href="{escape(page_obj.next_url)}"')
+
+        older = self.client.get('/orders/history/' + page_obj.next_url).context['orders']
+        self.assertEqual(len(older), 10)
+        self.assertFalse({order.pk for order in older} & {order.pk for order in orders})
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Export', slug='export')
+        self.product = Product.objects.create(
+            name='Export Widget', slug='export-widget', category=category,
+            description='Widget', price=12, stock=10
+        )
+        self.staff = User.objects.create_user('finance', 'finance@example.com', 'pass12345', is_staff=True)
+        for status in ('pending', 'shipped'):
+            order = Order.objects.create(
+                user=self.staff, total_amount=24, status=status,
+                **dict(CHECKOUT_DATA, first_name='=HYPERLINK("x")')
+            )
+            order.items.create(product=self.product, price=12, quantity=2)
+        self.client.force_login(self.staff)
+
+    def export(self, query):
+        response = self.client.get(f'/admin-panel/orders/export/{query}')
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_lines_export_uses_list_filters(self):
+        header, *rows = self.export('?status=shipped')
+        self.assertIn('line_total', header)
+        self.assertEqual(len(rows), 1)
+        self.assertIn(',shipped,', rows[0])
+        self.assertTrue(rows[0].endswith(',2,12.00,24.00'))
+        self.assertIn('"\'=HYPERLINK(""x"")"', rows[0])
+
+    def test_export_neutralises_formulas(self):
+        Order.objects.update(last_name='\t=1+1', city='\r@SUM(A1)')
+        response = self.client.get('/admin-panel/orders/export/?type=orders')
+        content = b''.join(response.streaming_content).decode()
+        header, *rows = csv.reader(io.StringIO(content, newline=''))
+        for row in rows:
+            self.assertIn('\'=HYPERLINK("x")', row)
+            self.assertIn("'\t=1+1", row)
+            self.assertIn("'\r@SUM(A1)", row)
+
+    def test_orders_export(self):
+        header, *rows = self.export('?type=orders')
+        self.assertNotIn('line_total', header)
+        self.assertEqual(len(rows), 2)
+
+
+class SQLiteProfileTests(TransactionTestCase):
+
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 2)  # FULL, as the test database is not WAL
+
+    def test_enable_wal_converts_the_file_once(self):
+        handle, name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.settings['wal'] = {**connections['default'].settings_dict, 'NAME': name}
+        try:
+            with connections['wal'].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'delete')  # connecting alone leaves the file alone
+            call_command('enable_wal', database='wal', stdout=io.StringIO())
+            with connections['wal'].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        finally:
+            connections['wal'].close()
+            del connections['wal']
+            del connections.settings['wal']
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(name + suffix):
+                    os.remove(name + suffix)
+
+    def test_only_write_transactions_take_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Order.objects.exists()
+            with write_transaction():
+                Order.objects.exists()
+        self.assertEqual([queries[0]['sql'], queries[3]['sql']], ['BEGIN DEFERRED', 'BEGIN IMMEDIATE'])
+        self.assertEqual(connection.transaction_mode, 'DEFERRED')
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    buyers = 12
+    attempts = 50
+
+    def setUp(self):
+        category = Category.objects.create(name='Stress', slug='stress')
+        self.product = Product.objects.create(
+            name='Stress Widget', slug='stress-widget', category=category,
+            description='Widget', price=20, stock=1000
+        )
+        self.users = []
+        for i in range(self.buyers):
+            user = User.objects.create_user(f'buyer{i}', f'buyer{i}@example.com', 'pass12345')
+            CartItem.objects.create(user=user, product=self.product, quantity=2)
+            self.users.append(user)
+
+    def checkout(self, user, client, barrier, errors):
+        try:
+            barrier.wait(timeout=30)
+            # SQLite allows a single writer, so a checkout that loses the
+            # write lock is simply retried until its order exists.
+            for _ in range(self.attempts):
+                try:
+                    client.post('/orders/checkout/', CHECKOUT_DATA)
+                    if Order.objects.filter(user=user).exists():
+                        return
+                except OperationalError:
+                    pass
+            errors.append(f'{user.username} could not check out')
+        except Exception as exc:
+            errors.append(repr(exc))
+        finally:
+            connection.close()
+
+    def test_parallel_checkouts_get_unique_order_ids(self):
+        barrier = threading.Barrier(self.buyers)
+        errors = []
+        threads = []
+        for user in self.users:
+            client = Client()
+            client.force_login(user)
+            threads.append(threading.Thread(
+                target=self.checkout, args=(user, client, barrier, errors)
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        orders = list(Order.objects.all())
+        self.assertEqual(len(orders), self.buyers)
+        order_ids = [order.order_id for order in orders]
+        self.assertEqual(len(set(order_ids)), self.buyers)
+        for order in orders:
+            self.assertEqual(order.order_id, f'ORD{order.pk:06d}')
+            self.assertEqual(order.items.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1000 - 2 * self.buyers)
@@ -2,27 +2,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from cart.models import CartItem
-from cart.views import get_cart_items
-from store.models import Product
+from django.db.models import Prefetch
+from cart import holds
+from store.pagination import paginate
 from .models import Order, OrderItem
 from .forms import CheckoutForm
+from .checkout import place_order
 
 @login_required
 def checkout(request):
-    cart_items = get_cart_items(request)
+    cart = request.cart
+    cart_items = cart.items
     
-    if not cart_items.exists():
+    if not cart_items:
         messages.error(request, 'Your cart is empty')
         return redirect('cart:cart_detail')
     
-    # Check stock availability
+    # Hold the units for the time it takes to fill in the form, so nobody
+    # else can claim them meanwhile
+    short = holds.reserve(cart.get_hold_owner(), {item.product_id: item.quantity for item in cart_items})
     for item in cart_items:
-        if item.quantity > item.product.stock:
-            messages.error(request, f'Only {item.product.stock} of {item.product.name} available')
+        if item.product_id in short:
+            messages.error(request, f'Only {short[item.product_id]} of {item.product.name} available')
             return redirect('cart:cart_detail')
     
+    # Summed from the loaded lines rather than through cart.total, which
+    # would store a summary in the session that the order is about to empty
     subtotal = sum(item.total_price for item in cart_items)
     shipping = 0 if subtotal >= 50 else 5
     total = subtotal + shipping
@@ -31,37 +36,12 @@ def checkout(request):
         form = CheckoutForm(request.POST)
         if form.is_valid():
             try:
-                with transaction.atomic():
-                    # Create order
-                    order = form.save(commit=False)
-                    order.user = request.user
-                    order.total_amount = total
-                    order.save()
-                    
-                    # Create order items and update stock
-                    for item in cart_items:
-                        # Double-check stock
-                        product = Product.objects.select_for_update().get(id=item.product.id)
-                        if product.stock < item.quantity:
-                            raise Exception(f'Insufficient stock for {product.name}')
-                        
-                        OrderItem.objects.create(
-                            order=order,
-                            product=product,
-                            quantity=item.quantity,
-                            price=product.price
-                        )
-                        
-                        # Update stock
-                        product.stock -= item.quantity
-                        product.save()
-                    
-                    # Clear cart
-                    cart_items.delete()
-                    
-                    messages.success(request, f'Order {order.order_id} placed successfully!')
-                    return redirect('orders:order_success', order_id=order.order_id)
-                    
+                order = form.save(commit=False)
+                order.user = request.user
+                order.total_amount = total
+                place_order(order, cart)
+                messages.success(request, f'Order {order.order_id} placed successfully!')
+                return redirect('orders:order_success', order_id=order.order_id)
             except Exception as e:
                 messages.error(request, f'Error placing order: {str(e)}')
                 return redirect('cart:cart_detail')
@@ -84,24 +64,32 @@ def checkout(request):
 
 @login_required
 def order_success(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id, user=request.user)
+    order = get_object_or_404(
+        Order.objects.prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product__category'))
+        ),
+        order_id=order_id, user=request.user
+    )
     context = {'order': order}
     return render(request, 'orders/order_success.html', context)
 
 @login_required
 def order_history(request):
-    # Get all orders for the user and ensure order_id is populated
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    for order in orders:
-        if not order.order_id:
-            order.save()  # This will trigger the save method to generate order_id
-    
-    context = {'orders': orders}
+    # Line counts and product names come from the order's summary fields,
+    # so the page is a single query on the order table
+    orders = Order.objects.filter(user=request.user)
+    page_obj = paginate(request, orders, 10, ['-created_at'], 'order_history')
+    context = {'orders': page_obj, 'page_obj': page_obj}
     return render(request, 'orders/order_history.html', context)
 
 @login_required
 def order_detail(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id, user=request.user)
+    order = get_object_or_404(
+        Order.objects.prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product__category'))
+        ),
+        order_id=order_id, user=request.user
+    )
     context = {'order': order}
     # templates directory contains `orders/order_details.html` (plural).
     # Render the existing template to avoid TemplateDoesNotExist errors.
@@ -49,7 +49,7 @@ function handleAddToCart(productId, button, quantity = 1) {
     .then(response => response.json())
     .then(data => {
         if (data.cart_count !== undefined) {
-            const cartCount = document.getElementById('cart-count');
+            const cartCount = document.querySelector('.cart-count');
             if (cartCount) {
                 cartCount.textContent = data.cart_count;
             }
@@ -62,4 +62,29 @@ function handleAddToCart(productId, button, quantity = 1) {
         setButtonState(button, 'error');
         alert('Error adding product to cart');
     });
-}
\ No newline at end of file
+}
+// Apply several cart changes in one request, e.g. for quick order or
+// "buy again": [{op: 'add'|'set'|'remove', product_id, quantity}, ...].
+// Resolves with the new cart; rejects with the server's message if any
+// operation fails, in which case nothing was changed.
+function updateCartBatch(operations) {
+    return fetch('/cart/batch/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken'),
+        },
+        body: JSON.stringify({'operations': operations})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.message);
+        }
+        const cartCount = document.querySelector('.cart-count');
+        if (cartCount) {
+            cartCount.textContent = data.cart_count;
+        }
+        return data;
+    });
+}
@@ -0,0 +1,114 @@
+// Add to cart functionality
+function addToCart(productId, quantity = 1) {
+    const btn = event.target;
+    const originalText = btn.innerHTML;
+
+    btn.innerHTML = '<span class="loading"></span> Adding...';
+    btn.disabled = true;
+
+    fetch('/cart/add/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+        },
+        body: JSON.stringify({
+            product_id: productId,
+            quantity: quantity
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Update cart count
+            const cartCount = document.querySelector('.cart-count');
+            if (cartCount) {
+                cartCount.textContent = data.cart_count;
+            } else if (data.cart_count > 0) {
+                const cartIcon = document.querySelector('.cart-icon');
+                cartIcon.innerHTML += `<span class="cart-count">${data.cart_count}</span>`;
+            }
+
+            // Show success message
+            showMessage('Product added to cart!', 'success');
+        } else {
+            showMessage(data.message || 'Error adding product to cart', 'error');
+        }
+    })
+    .catch(error => {
+        showMessage('Error adding product to cart', 'error');
+    })
+    .finally(() => {
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+    });
+}
+
+// Show message function
+function showMessage(message, type) {
+    const messagesDiv = document.querySelector('.messages') || createMessagesDiv();
+    const alertDiv = document.createElement('div');
+    alertDiv.className = `alert alert-${type}`;
+    alertDiv.textContent = message;
+
+    messagesDiv.appendChild(alertDiv);
+
+    // Remove message after 5 seconds
+    setTimeout(() => {
+        alertDiv.remove();
+    }, 5000);
+}
+
+function createMessagesDiv() {
+    const messagesDiv = document.createElement('div');
+    messagesDiv.className = 'messages';
+    document.querySelector('.container').insertBefore(messagesDiv, document.querySelector('.container').firstChild);
+    return messagesDiv;
+}
+
+// Update quantity in cart
+function updateQuantity(cartItemId, quantity) {
+    fetch('/cart/update/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+        },
+        body: JSON.stringify({
+            cart_item_id: cartItemId,
+            quantity: quantity
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        } else {
+            showMessage(data.message || 'Error updating quantity', 'error');
+        }
+    });
+}
+
+// Remove from cart
+function removeFromCart(cartItemId) {
+    if (confirm('Are you sure you want to remove this item from cart?')) {
+        fetch('/cart/remove/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+            },
+            body: JSON.stringify({
+                cart_item_id: cartItemId
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                showMessage(data.message || 'Error removing item', 'error');
+            }
+        });
+    }
+}
@@ -1,6 +1,7 @@
 # store/admin.py
 from django.contrib import admin
 from django.utils.html import format_html
+from .images import image_url
 from .models import Category, Product
 
 @admin.register(Category)
@@ -10,22 +11,23 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
     list_filter = ['parent', 'created_at']
     list_per_page = 20
+    ordering = ['full_name']
 
     def display_name(self, obj):
-        if obj.parent:
-            return f"{obj.parent.name} → {obj.name}"
-        return obj.name
+        return obj.full_name.replace(' > ', ' → ')
     display_name.short_description = 'Name'
+    display_name.admin_order_field = 'full_name'
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "parent":
+            # Only show top-level categories as parent options
+            queryset = Category.objects.filter(parent=None)
             # Exclude self from parent choices to prevent circular references
             if request.resolver_match.kwargs.get('object_id'):
-                kwargs["queryset"] = Category.objects.exclude(
+                queryset = queryset.exclude(
                     id=request.resolver_match.kwargs['object_id']
                 )
-            # Only show top-level categories as parent options
-            kwargs["queryset"] = Category.objects.filter(parent=None)
+            kwargs["queryset"] = queryset
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 @admin.register(Product)
@@ -39,50 +41,6 @@ class ProductAdmin(admin.ModelAdmin):
     
     def image_tag(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="50" height="50" style="border-radius: 5px;" />', obj.image.url)
+            return format_html('<img src="{}" width="50" height="50" style="border-radius: 5px;" />', image_url(obj, 'thumb'))
         return 'No Image'
     image_tag.short_description = 'Image'
-
-# cart/admin.py
-from django.contrib import admin
-from .models import CartItem
-
-@admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
-    list_display = ['user', 'product', 'quantity', 'total_price', 'created_at']
-    list_filter = ['created_at']
-    search_fields = ['user__username', 'product__name']
-
-# orders/admin.py
-from django.contrib import admin
-from .models import Order, OrderItem
-
-class OrderItemInline(admin.TabularInline):
-    model = OrderItem
-    readonly_fields = ['product', 'quantity', 'price', 'total_price']
-    extra = 0
-
-@admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ['order_id', 'user', 'status', 'payment_method', 'total_amount', 'created_at']
-    list_filter = ['status', 'payment_method', 'created_at']
-    search_fields = ['order_id', 'user__username', 'email']
-    list_editable = ['status']
-    readonly_fields = ['order_id', 'total_amount', 'created_at', 'updated_at']
-    inlines = [OrderItemInline]
-    
-    fieldsets = (
-        ('Order Information', {
-            'fields': ('order_id', 'user', 'status', 'payment_method', 'total_amount')
-        }),
-        ('Customer Details', {
-            'fields': ('first_name', 'last_name', 'email', 'phone')
-        }),
-        ('Billing Address', {
-            'fields': ('address', 'city', 'state', 'postal_code')
-        }),
-        ('Timestamps', {
-            'fields': ('created_at', 'updated_at'),
-            'classes': ('collapse',)
-        }),
-    )
\ No newline at end of file
@@ -11,6 +11,7 @@ urlpatterns = [
     path('products/edit/<int:product_id>/', admin_views.admin_product_edit, name='product_edit'),
     path('products/delete/<int:product_id>/', admin_views.admin_product_delete, name='product_delete'),
     path('orders/', admin_views.admin_orders, name='orders'),
+    path('orders/export/', admin_views.admin_orders_export, name='orders_export'),
     path('orders/<str:order_id>/', admin_views.admin_order_detail, name='order_detail'),
     path('users/', admin_views.admin_users, name='users'),
     path('categories/', admin_views.admin_categories, name='categories'),
@@ -1,13 +1,18 @@
 # store/admin_views.py
+import csv
+import itertools
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import StreamingHttpResponse
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
-from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import timedelta
 from store.models import Product, Category
-from orders.models import Order, OrderItem
+from store.pagination import paginate
+from orders.models import Order, OrderItem, DailySales, OrderStatusCount
+from orders.rankings import WINDOWS as SALES_WINDOWS, DEFAULT_WINDOW, top_products as rank_top_products
 from django.contrib.auth.models import User
 from cart.models import CartItem
 
@@ -16,27 +21,30 @@ from cart.models import CartItem
 def admin_dashboard(request):
     # Statistics
     total_products = Product.objects.count()
-    total_orders = Order.objects.count()
     total_users = User.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
 
-    # Revenue statistics
-    total_revenue = Order.objects.aggregate(total=Sum('total_amount'))['total'] or 0
-    today = timezone.now().date()
-    today_revenue = Order.objects.filter(
-        created_at__date=today
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
+    # Order and revenue statistics come from the rollup tables (orders.rollups)
+    status_counts = dict(OrderStatusCount.objects.values_list('status', 'count'))
+    total_orders = sum(status_counts.values())
+    pending_orders = status_counts.get('pending', 0)
+    total_revenue = DailySales.objects.aggregate(total=Sum('revenue'))['total'] or 0
+    today_revenue = DailySales.objects.filter(
+        date=timezone.localdate()
+    ).values_list('revenue', flat=True).first() or 0
 
     # Recent orders
     recent_orders = Order.objects.select_related('user').order_by('-created_at')[:5]
 
     # Low stock products
-    low_stock_products = Product.objects.filter(stock__lte=10, available=True).order_by('stock')[:5]
+    low_stock_products = Product.objects.select_related('category').filter(
+        stock__lte=10, available=True
+    ).order_by('stock')[:5]
 
     # Top selling products
-    top_products = Product.objects.annotate(
-        total_sold=Count('orderitem')
-    ).order_by('-total_sold')[:5]
+    sales_window = request.GET.get('window')
+    if sales_window not in SALES_WINDOWS:
+        sales_window = DEFAULT_WINDOW
+    top_products = rank_top_products(sales_window)
 
     context = {
         'total_products': total_products,
@@ -48,6 +56,8 @@ def admin_dashboard(request):
         'recent_orders': recent_orders,
         'low_stock_products': low_stock_products,
         'top_products': top_products,
+        'sales_window': sales_window,
+        'sales_windows': [(key, label) for key, (label, _) in SALES_WINDOWS.items()],
     }
     return render(request, 'admin_panel/dashboard.html', context)
 
@@ -67,12 +77,8 @@ def admin_products(request):
     if category_filter:
         products = products.filter(category_id=category_filter)
 
-    products = products.order_by('-created_at')
-
     # Pagination
-    paginator = Paginator(products, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, products, 20, ['-created_at'], 'admin_products')
 
     categories = Category.objects.all()
 
@@ -163,13 +169,8 @@ def admin_product_delete(request, product_id):
     return redirect('admin_panel:products')
 
 
-@staff_member_required
-def admin_orders(request):
-    status_filter = request.GET.get('status', '')
-    query = request.GET.get('q', '')
-
-    orders = Order.objects.select_related('user').prefetch_related('items').all()
-
+def filter_orders(orders, status_filter, query):
+    """The status and search filters shared by the order list and its export."""
     if status_filter:
         orders = orders.filter(status=status_filter)
 
@@ -179,13 +180,20 @@ def admin_orders(request):
             Q(user__username__icontains=query) |
             Q(email__icontains=query)
         )
+    return orders
 
-    orders = orders.order_by('-created_at')
+
+@staff_member_required
+def admin_orders(request):
+    status_filter = request.GET.get('status', '')
+    query = request.GET.get('q', '')
+
+    orders = filter_orders(
+        Order.objects.select_related('user'), status_filter, query
+    )
 
     # Pagination
-    paginator = Paginator(orders, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, orders, 20, ['-created_at'], 'admin_orders')
 
     context = {
         'page_obj': page_obj,
@@ -195,6 +203,76 @@ def admin_orders(request):
     return render(request, 'admin_panel/orders.html', context)
 
 
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+ORDER_EXPORT_COLUMNS = [
+    'order_id', 'created_at', 'status', 'username', 'email', 'first_name', 'last_name',
+    'city', 'state', 'postal_code', 'payment_method', 'total_amount',
+]
+LINE_EXPORT_COLUMNS = ['product_id', 'product_name', 'quantity', 'unit_price', 'line_total']
+
+
+def _csv_safe(value):
+    # Customer-entered text must not be read as a formula by spreadsheets
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return f"'{value}"
+    return value
+
+
+def _order_columns(order):
+    return [
+        order.order_id, order.created_at.isoformat(), order.status, order.user.username,
+        order.email, order.first_name, order.last_name, order.city, order.state,
+        order.postal_code, order.payment_method, order.total_amount,
+    ]
+
+
+@staff_member_required
+def admin_orders_export(request):
+    """
+    Stream the filtered orders as CSV: one row per order line by default,
+    or one row per order with ``?type=orders``. Rows are fetched in chunks
+    and written as they are produced, so memory stays flat.
+    """
+    export_type = 'orders' if request.GET.get('type') == 'orders' else 'lines'
+    orders = filter_orders(
+        Order.objects.all(), request.GET.get('status', ''), request.GET.get('q', '')
+    )
+
+    if export_type == 'orders':
+        header = ORDER_EXPORT_COLUMNS
+        rows = (
+            _order_columns(order)
+            for order in orders.select_related('user').order_by('pk').iterator(chunk_size=2000)
+        )
+    else:
+        header = ORDER_EXPORT_COLUMNS + LINE_EXPORT_COLUMNS
+        items = OrderItem.objects.filter(order__in=orders).select_related(
+            'order__user', 'product'
+        ).order_by('order_id', 'pk')
+        rows = (
+            _order_columns(item.order) + [
+                item.product_id, item.product.name, item.quantity, item.price,
+                item.quantity * item.price,
+            ]
+            for item in items.iterator(chunk_size=2000)
+        )
+
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow([_csv_safe(value) for value in row]) for row in itertools.chain([header], rows)),
+        content_type='text/csv',
+    )
+    filename = f'{export_type}-{timezone.localdate():%Y%m%d}.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @staff_member_required
 def admin_order_detail(request, order_id):
     order = get_object_or_404(Order.objects.prefetch_related('items__product'), order_id=order_id)
@@ -227,12 +305,8 @@ def admin_users(request):
             Q(last_name__icontains=query)
         )
 
-    users = users.order_by('-date_joined')
-
     # Pagination
-    paginator = Paginator(users, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, users, 20, ['-date_joined'], 'admin_users')
 
     context = {
         'page_obj': page_obj,
@@ -245,7 +319,7 @@ def admin_users(request):
 def admin_categories(request):
     categories = Category.objects.annotate(
         product_count=Count('products')
-    ).order_by('name')
+    ).order_by('full_name')
 
     context = {'categories': categories}
     return render(request, 'admin_panel/categories.html', context)
@@ -0,0 +1,200 @@
+# store/benchmarks.py
+"""
+Offline storefront and checkout benchmarks.
+
+``seed_catalogue`` fills the current database with a synthetic catalogue:
+a deep category tree, tens of thousands of products and many users.
+``run_benchmarks`` then drives the main customer paths through the Django
+test client and reports, per scenario, throughput, p50/p95/p99 latency and
+SQL query counts. Results are plain dicts so they can be saved as a JSON
+baseline and compared with ``compare_results`` on a later commit.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from cart.models import CartItem
+from .models import Category, Product
+from .search import rebuild_index
+
+ADJECTIVES = [
+    'classic', 'slim', 'vintage', 'organic', 'wireless', 'compact', 'deluxe', 'rugged',
+    'lightweight', 'premium', 'smart', 'waterproof', 'handmade', 'portable', 'modern',
+]
+NOUNS = [
+    'shirt', 'jacket', 'lamp', 'kettle', 'headphones', 'backpack', 'sneakers', 'novel',
+    'blender', 'watch', 'mug', 'speaker', 'notebook', 'chair', 'scarf', 'charger',
+]
+SCENARIOS = ('home', 'product_search', 'category_detail', 'add_to_cart', 'checkout')
+CHECKOUT_DATA = {
+    'first_name': 'Bench',
+    'last_name': 'Mark',
+    'email': 'bench@example.com',
+    'phone': '5550100',
+    'address': '1 Benchmark Road',
+    'city': 'Loadville',
+    'state': 'LV',
+    'postal_code': '10000',
+    'payment_method': 'cod',
+}
+
+
+def seed_catalogue(products=20000, depth=4, breadth=4, users=500, seed=0):
+    """Create the synthetic catalogue; returns the leaf categories and users."""
+    rng = random.Random(seed)
+
+    # Category.save() maintains the tree path, so categories go one by one
+    level = [None]
+    for d in range(depth):
+        next_level = []
+        for parent in level:
+            for b in range(breadth):
+                prefix = f'{parent.slug}-' if parent else 'bench'
+                category = Category.objects.create(
+                    name=f'{rng.choice(ADJECTIVES).title()} {d}.{b}',
+                    slug=f'{prefix}{b}',
+                    parent=parent,
+                )
+                next_level.append(category)
+        level = next_level
+    leaves = level
+
+    Product.objects.bulk_create([
+        Product(
+            name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {i}',
+            slug=f'bench-product-{i}',
+            category=rng.choice(leaves),
+            description=' '.join(rng.choices(ADJECTIVES + NOUNS, k=12)),
+            price=rng.randint(100, 50000) / 100,
+            stock=100000,
+            featured=i % 50 == 0,
+        )
+        for i in range(products)
+    ], batch_size=2000)
+    # bulk_create skips the signals that keep the search index current
+    rebuild_index()
+
+    password = make_password('bench-pass')
+    User.objects.bulk_create([
+        User(username=f'bench-user-{i}', email=f'bench{i}@example.com', password=password)
+        for i in range(users)
+    ], batch_size=2000)
+    return leaves, list(User.objects.filter(username__startswith='bench-user-'))
+
+
+def _measure(request, iterations, prepare=None, clear_cache=False):
+    timings = []
+    query_counts = []
+    for i in range(iterations):
+        if prepare:
+            prepare(i)
+        if clear_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request(i)
+            timings.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f'Benchmark request failed with status {response.status_code}')
+        query_counts.append(len(captured))
+    return timings, query_counts
+
+
+def _summarize(timings, query_counts):
+    ordered = sorted(timings)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'requests': len(timings),
+        'throughput_rps': round(len(timings) / sum(timings), 2),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'p50_ms': round(percentile(0.50), 3),
+        'p95_ms': round(percentile(0.95), 3),
+        'p99_ms': round(percentile(0.99), 3),
+        'mean_queries': round(statistics.fmean(query_counts), 2),
+        'max_queries': max(query_counts),
+    }
+
+
+def run_benchmarks(iterations=200, clear_cache=False, seed=0, scenarios=None):
+    """Run each scenario ``iterations`` times and return its summary by name."""
+    rng = random.Random(seed)
+    leaves = list(Category.objects.filter(slug__startswith='bench', children__isnull=True))
+    product_ids = list(Product.objects.filter(slug__startswith='bench-product-').values_list('id', flat=True))
+    users = list(User.objects.filter(username__startswith='bench-user-')[:50])
+    if not (leaves and product_ids and users):
+        raise RuntimeError('No benchmark catalogue found; seed one first')
+
+    anonymous = Client()
+    shoppers = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        shoppers.append((user, client))
+
+    def fill_cart(i):
+        user = shoppers[i % len(shoppers)][0]
+        CartItem.objects.bulk_create([
+            CartItem(user=user, product_id=product_id, quantity=1)
+            for product_id in rng.sample(product_ids, 3)
+        ])
+
+    available = {
+        'home': lambda: _measure(
+            lambda i: anonymous.get('/'), iterations, clear_cache=clear_cache
+        ),
+        'product_search': lambda: _measure(
+            lambda i: anonymous.get('/products/', {'q': rng.choice(ADJECTIVES + NOUNS)}),
+            iterations, clear_cache=clear_cache
+        ),
+        'category_detail': lambda: _measure(
+            lambda i: anonymous.get(f'/category/{rng.choice(leaves).slug}/'),
+            iterations, clear_cache=clear_cache
+        ),
+        'add_to_cart': lambda: _measure(
+            lambda i: shoppers[i % len(shoppers)][1].post(
+                '/cart/add/', {'product_id': rng.choice(product_ids), 'quantity': 1}
+            ),
+            iterations, clear_cache=clear_cache
+        ),
+        'checkout': lambda: _measure(
+            lambda i: shoppers[i % len(shoppers)][1].post('/orders/checkout/', CHECKOUT_DATA),
+            iterations, prepare=fill_cart, clear_cache=clear_cache
+        ),
+    }
+    # Start every run from empty carts so checkout always sees three lines
+    CartItem.objects.filter(user__in=users).delete()
+
+    results = {}
+    for name in scenarios or SCENARIOS:
+        results[name] = _summarize(*available[name]())
+        CartItem.objects.filter(user__in=users).delete()
+    return results
+
+
+def compare_results(baseline, current, threshold=20.0):
+    """
+    Yield ``(scenario, metric, before, after, change_percent, regressed)``
+    for every timing and query metric present in both result sets.
+    """
+    for scenario, metrics in current.items():
+        if scenario not in baseline:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_queries', 'max_queries'):
+            before = baseline[scenario].get(metric)
+            after = metrics.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            # The worst-case query count is deterministic, so any increase
+            # is a regression; averages move with cache hits like timings do
+            regressed = after > before if metric == 'max_queries' else change > threshold
+            yield scenario, metric, before, after, round(change, 1), regressed
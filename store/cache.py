@@ -0,0 +1,127 @@
+# store/cache.py
+import hashlib
+import re
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from ecommerce_store import replicas
+
+CATALOGUE_NAMESPACE = 'catalogue'
+
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = '__CSRF_TOKEN__'
+
+
+def get_cache():
+    return caches[getattr(settings, 'STOREFRONT_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'store:version:{namespace}'
+
+
+def product_namespace(slug):
+    return f'product:{slug}'
+
+
+def _new_version():
+    # Stamped with the time of the change; see _changed_recently()
+    return f'{time.time():.3f}:{uuid.uuid4().hex}'
+
+
+def _changed_recently(versions):
+    """Whether any version was bumped within the replicas' lag."""
+    cutoff = time.time() - getattr(settings, 'REPLICA_PIN_SECONDS', 0)
+    # Versions created on a cache miss carry no stamp: nothing changed then
+    return any(':' in version and float(version.split(':')[0]) > cutoff for version in versions)
+
+
+def bump(*namespaces):
+    """Invalidate every cached page that depends on any of ``namespaces``."""
+    get_cache().set_many({_version_key(ns): _new_version() for ns in namespaces}, None)
+
+
+def get_versions(namespaces):
+    store = get_cache()
+    keys = [_version_key(ns) for ns in namespaces]
+    versions = store.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        for key, value in missing.items():
+            if not store.add(key, value, None):
+                value = store.get(key)
+            versions[key] = value
+    return [versions[key] for key in keys]
+
+
+def page_cache_key(request, view_name, versions):
+    parts = [
+        view_name,
+        request.path,
+        '&'.join(f'{key}={value}' for key, values in sorted(request.GET.lists()) for value in values),
+        *versions,
+    ]
+    digest = hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+    return f'store:page:{view_name}:{digest}'
+
+
+def cache_storefront_page(namespaces=None):
+    """
+    Cache a storefront view's rendered page for anonymous visitors.
+
+    Only visitors without a session are served from the cache, so every
+    cached page is the same for all of them: signed-in users and anyone
+    with a cart get their own render. Pages are keyed on the path and
+    query string and the current version of every namespace the page
+    depends on; ``namespaces`` may be a callable taking the view's kwargs.
+    Signals bump those versions when catalogue data changes, so stale
+    entries are never served and simply age out. For
+    ``REPLICA_PIN_SECONDS`` after a bump, pages are rendered from the
+    primary database rather than a read replica.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # The session cookie alone tells; checking the user would load it
+            if (request.method not in ('GET', 'HEAD') or request.session.session_key
+                    or get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            deps = [CATALOGUE_NAMESPACE]
+            if callable(namespaces):
+                deps += namespaces(**kwargs)
+            elif namespaces:
+                deps += namespaces
+
+            store = get_cache()
+            versions = get_versions(deps)
+            key = page_cache_key(request, view.__name__, versions)
+            cached = store.get(key)
+            if cached is not None:
+                # get_token() also makes sure the visitor gets a CSRF cookie
+                content = cached['content'].replace(CSRF_PLACEHOLDER, get_token(request))
+                return HttpResponse(content, content_type=cached['content_type'])
+
+            if _changed_recently(versions):
+                # A replica may not have the change yet, and the page is
+                # cached under the new version until the next change
+                replicas.pin_to_primary()
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                content = CSRF_INPUT_RE.sub(
+                    rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', response.content.decode(response.charset)
+                )
+                store.set(key, {
+                    'content': content,
+                    'content_type': response['Content-Type'],
+                }, getattr(settings, 'STOREFRONT_CACHE_TIMEOUT', 600))
+            return response
+        return wrapper
+    return decorator
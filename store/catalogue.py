@@ -0,0 +1,235 @@
+# store/catalogue.py
+"""
+Streaming catalogue import and export.
+
+Rows are read and written one at a time, as CSV or JSON Lines, so memory use
+depends on the batch size and never on the file size. Products are matched on
+``slug`` and upserted with ``bulk_create(update_conflicts=True)``; categories
+are given as "Parent > Child" paths and created on first use.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils.text import slugify
+from cart.cart import bump_price_version
+from . import search
+from .cache import bump, CATALOGUE_NAMESPACE, product_namespace
+from .models import Category, Product
+
+FIELDS = ['slug', 'name', 'category', 'description', 'price', 'stock', 'available', 'featured']
+CATEGORY_SEPARATOR = ' > '
+UPDATE_FIELDS = ['name', 'category', 'description', 'price', 'stock', 'available', 'featured', 'updated_at']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class CatalogueImportError(ValueError):
+    """A row that cannot be imported; carries the line number of the row."""
+
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` from a CSV or JSON Lines text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as exc:
+                    raise CatalogueImportError(line_number, f'invalid JSON ({exc})')
+
+
+class CategoryResolver:
+    """Map "A > B > C" paths to categories, creating missing ones once."""
+
+    def __init__(self):
+        self.by_path = {}
+        self.slugs = set()
+        for category in Category.objects.only('id', 'name', 'slug', 'parent_id', 'path', 'depth', 'full_name'):
+            self.by_path[category.full_name] = category
+            self.slugs.add(category.slug)
+
+    def resolve(self, path):
+        names = [name.strip() for name in str(path).split(CATEGORY_SEPARATOR.strip())]
+        if not all(names):
+            raise ValueError(f'invalid category path {path!r}')
+
+        parent = None
+        for depth in range(len(names)):
+            full_name = CATEGORY_SEPARATOR.join(names[:depth + 1])
+            category = self.by_path.get(full_name)
+            if category is None:
+                category = Category.objects.create(
+                    name=names[depth], slug=self.unique_slug(names[depth]), parent=parent
+                )
+                self.by_path[category.full_name] = category
+            parent = category
+        return parent
+
+    def unique_slug(self, name):
+        base = slugify(name)[:90] or 'category'
+        slug, n = base, 1
+        while slug in self.slugs:
+            n += 1
+            slug = f'{base}-{n}'
+        self.slugs.add(slug)
+        return slug
+
+
+class SlugAllocator:
+    """
+    Slugs for rows that do not bring their own: ``slugify(name)``, suffixed
+    ``-2``, ``-3``... when a name repeats within the file, so re-importing
+    the same file maps every row back onto the same product.
+
+    A candidate is skipped when another row of the file gives it explicitly
+    (``reserved``), when this import already handed it out, or when it
+    belongs to an existing product of another name; a product of the same
+    name is the row's own earlier import, which it updates.
+    """
+
+    def __init__(self, reserved=()):
+        self.counts = {}
+        self.taken = set(reserved)
+
+    def allocate(self, name):
+        base = slugify(name)[:190] or 'product'
+        n = self.counts.get(base, 0)
+        while True:
+            n += 1
+            slug = base if n == 1 else f'{base}-{n}'
+            if slug in self.taken:
+                continue
+            if not Product.objects.filter(slug=slug).exclude(name=name[:200]).exists():
+                break
+        self.counts[base] = n
+        self.taken.add(slug)
+        return slug
+
+
+def explicit_slugs(rows):
+    """The slugs ``(line_number, row)`` pairs give explicitly."""
+    return {slug for _, row in rows if (slug := str(row.get('slug') or '').strip())}
+
+
+def _parse_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def build_product(line, row, categories, slugs):
+    name = (row.get('name') or '').strip()
+    if not name:
+        raise CatalogueImportError(line, 'missing name')
+    try:
+        price = Decimal(str(row.get('price', '')).strip())
+        stock = int(row.get('stock') or 0)
+        category = categories.resolve(row.get('category') or '')
+    except (InvalidOperation, ValueError) as exc:
+        raise CatalogueImportError(line, str(exc) or 'invalid value')
+    if price < 0 or stock < 0:
+        raise CatalogueImportError(line, 'price and stock must not be negative')
+
+    return Product(
+        slug=str(row.get('slug') or '').strip() or slugs.allocate(name),
+        name=name[:200],
+        category=category,
+        description=row.get('description') or '',
+        price=price,
+        stock=stock,
+        available=_parse_bool(row.get('available'), True),
+        featured=_parse_bool(row.get('featured'), False),
+    )
+
+
+def _write_batch(batch):
+    # One upsert may not touch the same row twice, so the last row wins
+    products = list({product.slug: product for product in batch}.values())
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create skips the post_save signals that maintain the search index
+        slugs = [product.slug for product in products]
+        search.index_products(Product.objects.filter(slug__in=slugs))
+    bump(*[product_namespace(slug) for slug in slugs])
+    return len(products)
+
+
+def import_products(rows, batch_size=1000, on_batch=None, reserved_slugs=()):
+    """
+    Upsert products from ``(line_number, row)`` pairs in batches.
+
+    ``reserved_slugs`` should hold ``explicit_slugs()`` of the whole file, so
+    a generated slug never lands on a product a later row names explicitly.
+    ``on_batch(rows_written)`` is called after every batch. Returns the number
+    of rows written; a bad row raises CatalogueImportError; batches before
+    it stay committed.
+    """
+    categories = CategoryResolver()
+    slugs = SlugAllocator(reserved_slugs)
+    batch = []
+    written = 0
+    try:
+        for line, row in rows:
+            batch.append(build_product(line, row, categories, slugs))
+            if len(batch) >= batch_size:
+                written += _write_batch(batch)
+                batch = []
+                if on_batch:
+                    on_batch(written)
+        if batch:
+            written += _write_batch(batch)
+            if on_batch:
+                on_batch(written)
+    finally:
+        # Listings and cart prices may show any of the products just written
+        bump(CATALOGUE_NAMESPACE)
+        bump_price_version()
+    return written
+
+
+def export_rows(chunk_size=2000):
+    """Yield every product as a dict of FIELDS, streaming from the database."""
+    products = Product.objects.select_related('category').order_by('pk')
+    for product in products.iterator(chunk_size=chunk_size):
+        yield {
+            'slug': product.slug,
+            'name': product.name,
+            'category': product.category.full_name or product.category.name,
+            'description': product.description,
+            'price': str(product.price),
+            'stock': product.stock,
+            'available': product.available,
+            'featured': product.featured,
+        }
+
+
+def write_rows(rows, stream, fmt):
+    """Write row dicts to a text stream as CSV or JSON Lines; returns the count."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+            count += 1
+    return count
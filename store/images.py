@@ -0,0 +1,150 @@
+# store/images.py
+"""
+Resized derivatives of product images.
+
+Every uploaded ``Product.image`` gets a thumbnail, grid and detail size,
+each also encoded as WebP when Pillow was built with it. File names carry
+a hash of the source bytes, so they never change under a URL and can be
+cached forever. ``Product.image_variants`` records what was generated for
+which source file; templates ask for a size with ``{% product_image %}``
+and fall back to the original until the variants exist.
+
+Generation runs on a small background thread pool after the saving
+transaction commits, so admin uploads return straight away. Set
+``IMAGE_VARIANTS_ASYNC = False`` to generate inline instead.
+"""
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+from .cache import bump, CATALOGUE_NAMESPACE, product_namespace
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# name -> (max width, max height, crop to fill)
+SIZES = {
+    'thumb': (160, 160, True),
+    'grid': (480, 480, False),
+    'detail': (1200, 1200, False),
+}
+VARIANT_DIR = 'products/variants'
+WEBP_SUPPORTED = features.check('webp')
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    elif fmt == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _store(name, data):
+    # Hashed names mean an existing file already has exactly this content
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return name
+
+
+def build_variants(source_name):
+    """Write every size of ``source_name`` and return the variants mapping."""
+    with default_storage.open(source_name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(source_name))[0][:40]
+
+    original = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+    original = original.convert('RGBA' if has_alpha else 'RGB')
+    fmt, ext = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+
+    variants = {'source': source_name}
+    for size, (width, height, crop) in SIZES.items():
+        if crop:
+            resized = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        else:
+            resized = original.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+        base = f'{VARIANT_DIR}/{stem}-{digest}-{size}'
+        variant = {
+            'width': resized.width,
+            'height': resized.height,
+            'src': _store(f'{base}.{ext}', _encode(resized, fmt)),
+        }
+        if WEBP_SUPPORTED:
+            variant['webp'] = _store(f'{base}.webp', _encode(resized, 'WEBP'))
+        variants[size] = variant
+    return variants
+
+
+def generate_variants(product_id):
+    """Build and save the variants for a product's current image."""
+    product = Product.objects.filter(pk=product_id).only('slug', 'image', 'image_variants').first()
+    if product is None or not product.image:
+        return None
+    source_name = product.image.name
+    if product.image_variants.get('source') == source_name:
+        return product.image_variants
+
+    variants = build_variants(source_name)
+    # Only store them if the image was not replaced while we were working;
+    # update() also keeps this from re-triggering the post_save signal
+    if Product.objects.filter(pk=product_id, image=source_name).update(image_variants=variants):
+        bump(CATALOGUE_NAMESPACE, product_namespace(product.slug))
+    return variants
+
+
+def _generate_in_background(product_id):
+    try:
+        generate_variants(product_id)
+    except Exception:
+        logger.exception('Could not generate image variants for product %s', product_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(product_id):
+    """Generate a product's variants once the current transaction commits."""
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_generate_in_background, product_id))
+    else:
+        transaction.on_commit(lambda: generate_variants(product_id))
+
+
+def variant(product, size):
+    """The variant dict for ``size``, or None until it has been generated."""
+    variants = product.image_variants or {}
+    if not product.image or variants.get('source') != product.image.name:
+        return None
+    return variants.get(size)
+
+
+def image_url(product, size):
+    """URL of the best available image for ``size``; '' without an image."""
+    if not product.image:
+        return ''
+    found = variant(product, size)
+    return default_storage.url(found['src']) if found else product.image.url
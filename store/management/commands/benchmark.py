@@ -0,0 +1,121 @@
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from store.benchmarks import SCENARIOS, seed_catalogue, run_benchmarks, compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the storefront and checkout against a synthetic catalogue '
+        'in a throwaway test database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--depth', type=int, default=4, help='Category tree depth')
+        parser.add_argument('--breadth', type=int, default=4, help='Subcategories per category')
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Run only this scenario (repeatable)')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Clear the cache before every request')
+        parser.add_argument('--save', metavar='PATH', help='Write the results as a JSON baseline')
+        parser.add_argument('--compare', metavar='PATH', help='Compare with a saved baseline')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='Latency increase, in percent, reported as a regression')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline {options["compare"]}: {exc}')
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(
+                f'Seeding {options["products"]} products, '
+                f'{options["breadth"]}^{options["depth"]} categories and {options["users"]} users...'
+            )
+            seed_catalogue(
+                products=options['products'], depth=options['depth'],
+                breadth=options['breadth'], users=options['users'], seed=options['seed'],
+            )
+            results = run_benchmarks(
+                iterations=options['iterations'], clear_cache=options['no_cache'],
+                seed=options['seed'], scenarios=options['scenario'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+
+        meta = {
+            'commit': self.current_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            **{key: options[key] for key in (
+                'products', 'depth', 'breadth', 'users', 'iterations', 'seed', 'no_cache'
+            )},
+        }
+        report = {'meta': meta, 'results': results}
+        if options['save']:
+            Path(options['save']).parent.mkdir(parents=True, exist_ok=True)
+            Path(options['save']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {options["save"]}'))
+
+        if baseline is not None and self.print_comparison(baseline, meta, results, options['threshold']):
+            raise CommandError('Benchmark regressed against the baseline')
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"scenario":<16}{"req/s":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+            f'{"queries":>9}{"max q":>7}'
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<16}{row["throughput_rps"]:>9}{row["p50_ms"]:>10}{row["p95_ms"]:>10}'
+                f'{row["p99_ms"]:>10}{row["mean_queries"]:>9}{row["max_queries"]:>7}'
+            )
+
+    def print_comparison(self, baseline, meta, results, threshold):
+        previous = baseline.get('meta', {})
+        self.stdout.write(
+            f'\nCompared with {previous.get("commit") or "baseline"} ({previous.get("created_at", "?")}):'
+        )
+        for key in ('products', 'users', 'iterations', 'database'):
+            if key in previous and previous[key] != meta[key]:
+                self.stdout.write(self.style.WARNING(
+                    f'Baseline used {key}={previous[key]}, this run {meta[key]}'
+                ))
+        regressed = False
+        for scenario, metric, before, after, change, is_regression in compare_results(
+            baseline.get('results', {}), results, threshold
+        ):
+            line = f'{scenario:<16}{metric:<14}{before:>10} -> {after:<10}{change:+.1f}%'
+            if is_regression:
+                regressed = True
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressed
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
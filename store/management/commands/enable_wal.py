@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+class Command(BaseCommand):
+    help = (
+        'Switch an SQLite database file to write-ahead logging, once per file, '
+        'so readers and the writer stop blocking each other'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'{options["database"]} is not an SQLite database')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            mode = cursor.fetchone()[0]
+        # Connections opened before the switch keep the stricter synchronous
+        connection.close()
+        if mode != 'wal':
+            raise CommandError(f'SQLite kept journal_mode={mode} (in-memory databases cannot use WAL)')
+        self.stdout.write(self.style.SUCCESS(f'{connection.settings_dict["NAME"]} now uses WAL'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from store.query_plans import HOT_QUERIES, check_plans
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot storefront, order and cart queries and fail on any full table scan or sorted listing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', action='append', choices=list(HOT_QUERIES),
+                            help='Check only this query (repeatable)')
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, plan, problems in check_plans(options['query']):
+            scanned = [table for table in problems if table != 'ORDER BY']
+            if problems:
+                failed.append(name)
+                messages = [f'full scan of {", ".join(scanned)}'] if scanned else []
+                if 'ORDER BY' in problems:
+                    messages.append('sorts every matching row')
+                self.stdout.write(self.style.ERROR(f'{name}: {"; ".join(messages)}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if problems or options['verbosity'] > 1:
+                self.stdout.write('\n'.join(f'    {line}' for line in plan.splitlines()))
+        if failed:
+            raise CommandError(f'{len(failed)} hot queries scan a whole table or sort: {", ".join(failed)}')
@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from store.catalogue import export_rows, write_rows
+from .import_catalogue import detect_format
+
+
+class Command(BaseCommand):
+    help = 'Stream every product to a CSV or JSON Lines file that import_catalogue can read back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' for standard output")
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format']) if path != '-' else (options['format'] or 'jsonl')
+        start = time.perf_counter()
+        try:
+            stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        try:
+            count = write_rows(export_rows(options['chunk_size']), stream, fmt)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        if stream is not sys.stdout:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'Exported {count} products in {elapsed:.1f}s'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from store.images import generate_variants
+from store.models import Product
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail, grid and detail sizes for product images that lack them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if options['force']:
+            products.update(image_variants={})
+
+        done = failed = 0
+        for product_id in products.values_list('pk', flat=True).iterator():
+            try:
+                generate_variants(product_id)
+                done += 1
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'Product {product_id}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} product images, {failed} failed'))
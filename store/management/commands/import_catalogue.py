@@ -0,0 +1,71 @@
+import shutil
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from store.catalogue import FIELDS, CatalogueImportError, explicit_slugs, read_rows, import_products
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise CommandError('Cannot tell the file format from its name; pass --format')
+
+
+class Command(BaseCommand):
+    help = (
+        'Upsert products from a CSV or JSON Lines file, matched on slug. '
+        f'Columns: {", ".join(FIELDS)}; category is a "Parent > Child" path'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input")
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--progress-every', type=int, default=10000,
+                            help='Report progress after this many rows')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format']) if path != '-' else (options['format'] or 'jsonl')
+        start = time.perf_counter()
+        next_report = [options['progress_every']]
+
+        def report(written):
+            if written >= next_report[0]:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{written} rows ({written / elapsed:.0f} rows/s)')
+                next_report[0] = written + options['progress_every']
+
+        try:
+            if path == '-':
+                # Spool standard input, which cannot be read twice
+                stream = tempfile.TemporaryFile('w+', newline='', encoding='utf-8')
+                shutil.copyfileobj(sys.stdin, stream)
+            else:
+                stream = open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        try:
+            # A first pass collects the slugs rows give explicitly, so none
+            # of them is generated for an earlier row without one
+            reserved = explicit_slugs(read_rows(stream, fmt))
+            stream.seek(0)
+            written = import_products(
+                read_rows(stream, fmt), batch_size=options['batch_size'], on_batch=report,
+                reserved_slugs=reserved,
+            )
+        except CatalogueImportError as exc:
+            raise CommandError(f'Import stopped at {exc}')
+        finally:
+            stream.close()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {written} products in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from store.search import fts_available, rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index'
+
+    def handle(self, *args, **kwargs):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING('Search index is not available on this database'))
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products'))
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+FORWARD_SQL = [
+    """
+    CREATE VIRTUAL TABLE store_product_fts USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO store_product_fts(rowid, name, description, category)
+    SELECT p.id, p.name, p.description, c.name
+    FROM store_product p JOIN store_category c ON c.id = p.category_id
+    """,
+]
+
+REVERSE_SQL = [
+    'DROP TABLE IF EXISTS store_product_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # The FTS5 index is SQLite only; other backends fall back to icontains.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FORWARD_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in REVERSE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
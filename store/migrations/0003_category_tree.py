@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:18
+
+from django.db import migrations, models
+
+
+def build_category_tree(apps, schema_editor):
+    Category = apps.get_model('store', 'Category')
+    categories = {c.pk: c for c in Category.objects.all()}
+
+    def fill(category):
+        if category.path:
+            return
+        if category.parent_id is None:
+            category.path, category.depth, category.full_name = f'{category.pk}/', 0, category.name
+        else:
+            parent = categories[category.parent_id]
+            fill(parent)
+            category.path = f'{parent.path}{category.pk}/'
+            category.depth = parent.depth + 1
+            category.full_name = f'{parent.full_name} > {category.name}'
+
+    for category in categories.values():
+        fill(category)
+    Category.objects.bulk_update(categories.values(), ['path', 'depth', 'full_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='full_name',
+            field=models.CharField(default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_category_tree, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_produ_slug_e4adbf_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_produ_availab_0c4d5d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_produ_feature_408939_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('available', True)), fields=['name', 'id'], name='store_prod_avail_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('available', True)), fields=['price', 'id'], name='store_prod_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('available', True)), fields=['created_at', 'id'], name='store_prod_avail_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('available', True), ('featured', True)), fields=['created_at'], name='store_prod_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('available', True)), fields=['stock'], name='store_prod_low_stock_idx'),
+        ),
+    ]
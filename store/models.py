@@ -1,7 +1,9 @@
 # store/models.py
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.urls import reverse
-from django.contrib.auth.models import User
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -9,22 +11,104 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Materialized tree, maintained by save(): path is the chain of ids from
+    # the root ("1/4/9/") and full_name the matching "A > B > C" label.
+    path = models.CharField(max_length=255, default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    full_name = models.CharField(max_length=500, default='', editable=False)
     
     class Meta:
         verbose_name_plural = 'categories'
         unique_together = ('name', 'parent')
     
     def __str__(self):
-        full_path = [self.name]
-        k = self.parent
-        while k is not None:
-            full_path.append(k.name)
-            k = k.parent
-        return ' > '.join(full_path[::-1])
+        return self.full_name or self.name
     
     def get_absolute_url(self):
         return reverse('store:category', kwargs={'slug': self.slug})
 
+    def clean(self):
+        if self._is_moving_under_itself():
+            raise ValidationError({'parent': 'A category cannot be moved under itself or one of its subcategories.'})
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            # An ancestor may have moved since this instance was loaded:
+            # start from the stored tree fields and a fresh parent
+            stored = Category.objects.filter(pk=self.pk).values_list('path', 'depth', 'full_name').first()
+            if stored:
+                self.path, self.depth, self.full_name = stored
+            if self.parent_id is not None:
+                self.parent = Category.objects.get(pk=self.parent_id)
+        if self._is_moving_under_itself():
+            raise ValueError('A category cannot be moved under itself or one of its subcategories.')
+        super().save(*args, **kwargs)
+
+        path, depth, full_name = self._build_tree_fields()
+        if (path, depth, full_name) == (self.path, self.depth, self.full_name):
+            return
+
+        old_path, old_full_name = self.path, self.full_name
+        depth_change = depth - self.depth
+        Category.objects.filter(pk=self.pk).update(path=path, depth=depth, full_name=full_name)
+        if old_path:
+            # Re-root the whole subtree in a single UPDATE
+            self.get_descendants().update(
+                path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + depth_change,
+                full_name=Concat(Value(full_name), Substr('full_name', len(old_full_name) + 1)),
+            )
+        self.path, self.depth, self.full_name = path, depth, full_name
+
+    def _build_tree_fields(self):
+        if self.parent_id is None:
+            return f'{self.pk}/', 0, self.name
+        parent = self.parent
+        return f'{parent.path}{self.pk}/', parent.depth + 1, f'{parent.full_name} > {self.name}'
+
+    def _is_moving_under_itself(self):
+        if self.pk is None or self.parent_id is None:
+            return False
+        return self.parent_id == self.pk or bool(self.path) and self.parent.path.startswith(self.path)
+
+    def get_descendants(self, include_self=False):
+        """All categories below this one, as a single indexed range query."""
+        # Paths end in '/', and '0' is the next character after it, so the
+        # subtree is exactly the range [path, path[:-1] + '0').
+        descendants = Category.objects.filter(
+            path__gte=self.path,
+            path__lt=self.path[:-1] + '0',
+            path__startswith=self.path,
+        )
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants
+
+    def product_filters(self, descendant_ids=None):
+        """
+        Filters for the products in this category's subtree, as
+        ``(filter, partitions)`` for ``paginate()``.
+
+        Each partition is one category: a single range of the
+        ``(category, sort key, id)`` indexes, already in sort order, so a
+        page merges those ranges rather than sorting the whole subtree. The
+        filter reads the same ranges all at once, which is what counting
+        needs. A leaf category is one range and needs no partitions.
+        ``descendant_ids`` saves the query for them when already known.
+        """
+        if descendant_ids is None:
+            descendant_ids = self.get_descendants().values_list('pk', flat=True)
+        ids = [self.pk, *descendant_ids]
+        if len(ids) == 1:
+            return models.Q(category=self), None
+        return models.Q(category_id__in=ids), [models.Q(category_id=pk) for pk in ids]
+
+    def get_ancestors(self):
+        """Ancestors from the root down, in a single query."""
+        ancestor_ids = [int(pk) for pk in self.path.split('/')[:-2]]
+        return Category.objects.filter(pk__in=ancestor_ids).order_by('depth')
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
@@ -32,6 +116,8 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Resized copies of image, written by store.images once it is uploaded
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.PositiveIntegerField(default=0)
     available = models.BooleanField(default=True)
     featured = models.BooleanField(default=False)
@@ -40,103 +126,41 @@ class Product(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # Shaped after the storefront queries, which all filter on available;
+        # store.query_plans lists them and explain_queries checks each plan.
+        # slug is already indexed by its unique constraint.
         indexes = [
-            models.Index(fields=['slug']),
-            models.Index(fields=['available']),
-            models.Index(fields=['featured']),
+            models.Index(fields=['name', 'id'], condition=models.Q(available=True),
+                         name='store_prod_avail_name_idx'),
+            models.Index(fields=['category', 'name', 'id'], condition=models.Q(available=True),
+                         name='store_prod_avail_cat_name_idx'),
+            models.Index(fields=['category', 'price', 'id'], condition=models.Q(available=True),
+                         name='store_prod_avail_cat_price_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], condition=models.Q(available=True),
+                         name='store_prod_avail_cat_new_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(available=True),
+                         name='store_prod_avail_price_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(available=True),
+                         name='store_prod_avail_new_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(available=True, featured=True),
+                         name='store_prod_featured_idx'),
+            models.Index(fields=['stock'], condition=models.Q(available=True),
+                         name='store_prod_low_stock_idx'),
         ]
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        # Remember the stored image so a new upload can be detected on save
+        product._saved_image = product.__dict__.get('image')
+        return product
+
     def get_absolute_url(self):
         return reverse('store:product_detail', kwargs={'slug': self.slug})
     
     @property
     def is_in_stock(self):
         return self.stock > 0
-
-# cart/models.py
-from django.db import models
-from django.contrib.auth.models import User
-from store.models import Product
-
-class CartItem(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    session_key = models.CharField(max_length=40, null=True, blank=True)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
-    quantity = models.PositiveIntegerField(default=1)
-    created_at = models.DateTimeField(auto_now_add=True)
-    
-    class Meta:
-        unique_together = [['user', 'product'], ['session_key', 'product']]
-    
-    def __str__(self):
-        return f'{self.quantity} x {self.product.name}'
-    
-    @property
-    def total_price(self):
-        return self.quantity * self.product.price
-
-# orders/models.py
-from django.db import models
-from django.contrib.auth.models import User
-from store.models import Product
-
-class Order(models.Model):
-    ORDER_STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('confirmed', 'Confirmed'),
-        ('shipped', 'Shipped'),
-        ('delivered', 'Delivered'),
-        ('cancelled', 'Cancelled'),
-    ]
-    
-    PAYMENT_METHOD_CHOICES = [
-        ('cod', 'Cash on Delivery'),
-        ('online', 'Online Payment'),
-    ]
-    
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
-    order_id = models.CharField(max_length=20, unique=True)
-    status = models.CharField(max_length=20, choices=ORDER_STATUS_CHOICES, default='pending')
-    payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, default='cod')
-    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    
-    # Billing Address
-    first_name = models.CharField(max_length=50)
-    last_name = models.CharField(max_length=50)
-    email = models.EmailField()
-    phone = models.CharField(max_length=15)
-    address = models.TextField()
-    city = models.CharField(max_length=50)
-    state = models.CharField(max_length=50)
-    postal_code = models.CharField(max_length=10)
-    
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    class Meta:
-        ordering = ['-created_at']
-    
-    def __str__(self):
-        return f'Order {self.order_id}'
-    
-    def save(self, *args, **kwargs):
-        if not self.order_id:
-            import uuid
-            self.order_id = str(uuid.uuid4()).upper()[:8]
-        super().save(*args, **kwargs)
-
-class OrderItem(models.Model):
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
-    quantity = models.PositiveIntegerField()
-    price = models.DecimalField(max_digits=10, decimal_places=2)
-    
-    def __str__(self):
-        return f'{self.quantity} x {self.product.name}'
-    
-    @property
-    def total_price(self):
-        return self.quantity * self.price
\ No newline at end of file
@@ -0,0 +1,221 @@
+# store/pagination.py
+import base64
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Keep full microsecond precision; a truncated key would skip rows."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPage:
+    """One page of a CursorPaginator, shaped like Django's Page where it can be."""
+
+    is_cursor_page = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.query_params = QueryDict(mutable=True)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _url(self, cursor=None):
+        params = self.query_params.copy()
+        if cursor:
+            params['cursor'] = cursor
+        return f'?{params.urlencode()}'
+
+    @property
+    def first_url(self):
+        return self._url()
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor)
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_cursor)
+
+
+class CursorPaginator:
+    """
+    Keyset paginator: each page is fetched with ``WHERE (sort keys) > cursor``
+    instead of ``OFFSET``, so deep pages cost the same as the first one.
+
+    ``ordering`` uses the usual ``order_by`` syntax on concrete model fields;
+    the primary key is appended as a tiebreaker. No ``COUNT(*)`` is issued
+    unless ``with_count`` is set, in which case the total is cached for
+    ``PAGINATION_COUNT_CACHE_TIMEOUT`` seconds.
+
+    ``partitions`` optionally splits the queryset into filters that each
+    select one range of an index in sort order, such as one category of
+    ``(category, name, id)``. A page is then the UNION ALL of the ranges
+    under the page's ORDER BY and LIMIT, which the database answers by
+    merging the ranges and stops reading after one page, where filtering on
+    all of them at once would have it sort every matching row. Beyond
+    ``MAX_PARTITIONS`` the queryset is read as it is.
+    """
+
+    MAX_PARTITIONS = 200
+
+    def __init__(self, queryset, per_page, ordering, with_count=False, partitions=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.with_count = with_count
+        self.partitions = partitions if partitions and 1 < len(partitions) <= self.MAX_PARTITIONS else None
+        self.ordering = []
+        for name in ordering:
+            descending = name.startswith('-')
+            self.ordering.append((name.lstrip('-'), descending))
+        if not any(name in ('pk', 'id') for name, _ in self.ordering):
+            self.ordering.append(('pk', self.ordering[-1][1] if self.ordering else False))
+
+    @cached_property
+    def count(self):
+        if not self.with_count:
+            return None
+        try:
+            sql, params = self.queryset.query.sql_with_params()
+        except EmptyResultSet:  # none(), or a filter such as pk__in=[]
+            return 0
+        digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+        return cache.get_or_set(
+            f'pagination:count:{digest}',
+            self.queryset.count,
+            getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60),
+        )
+
+    def _field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, self._field(name).attname) for name, _ in self.ordering]
+        payload = json.dumps({'d': direction, 'v': values}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return ``(direction, values)``, or ``(None, None)`` for a bad cursor."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [
+                self._field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, payload['v'], strict=True)
+            ]
+            if payload['d'] not in ('n', 'p'):
+                raise ValueError(payload['d'])
+            return payload['d'], values
+        except Exception:
+            return None, None
+
+    def _after(self, values, backwards):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering."""
+        keyset = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition = Q(**{f'{name}__{lookup}': values[i]})
+            for previous_name, _ in self.ordering[:i]:
+                condition &= Q(**{previous_name: values[self._position(previous_name)]})
+            keyset |= condition
+        # A plain range on the leading key lets the database use its index
+        name, descending = self.ordering[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & keyset
+
+    def _position(self, name):
+        return [field for field, _ in self.ordering].index(name)
+
+    def page_queryset(self, values=None, backwards=False):
+        """The query for the page after ``values``, with one extra row."""
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        # A combined query can only be ordered by its columns, so not by 'pk'
+        order_by = [
+            f'-{self._field(name).name}' if descending != backwards else self._field(name).name
+            for name, descending in self.ordering
+        ]
+        if self.partitions:
+            parts = [queryset.filter(partition).order_by() for partition in self.partitions]
+            queryset = parts[0].union(*parts[1:], all=True)
+        return queryset.order_by(*order_by)[:self.per_page + 1]
+
+    def get_page(self, cursor=None):
+        direction, values = self.decode_cursor(cursor) if cursor else (None, None)
+        backwards = direction == 'p'
+
+        rows = list(self.page_queryset(values, backwards))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1], 'n') if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'p') if rows and has_previous else None,
+        )
+
+
+def paginate(request, queryset, per_page, ordering, listing, partitions=None):
+    """
+    Paginate ``queryset`` for a listing view.
+
+    Listings named in ``settings.CURSOR_PAGINATED_LISTINGS`` use keyset
+    pagination driven by ``?cursor=``, reading ``partitions`` as described
+    on CursorPaginator; the rest keep numbered ``?page=`` pages.
+    """
+    if listing in getattr(settings, 'CURSOR_PAGINATED_LISTINGS', ()):
+        paginator = CursorPaginator(
+            queryset, per_page, ordering,
+            with_count=listing in getattr(settings, 'CURSOR_PAGINATION_COUNTS', ()),
+            partitions=partitions,
+        )
+        page = paginator.get_page(request.GET.get('cursor'))
+        # Links keep the listing's filters and sort, swapping only the cursor
+        page.query_params = request.GET.copy()
+        for key in ('cursor', 'page'):
+            page.query_params.pop(key, None)
+        return page
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,138 @@
+# store/query_plans.py
+"""
+The shop's hot queries, and a check that every one of them is index-backed.
+
+``HOT_QUERIES`` builds each query in the shape the views actually run it,
+with placeholder values. ``check_plans`` asks the database to EXPLAIN each
+one and reports any table it reads with a full scan, and any listing
+that sorts its rows rather than reading them in index order. On PostgreSQL
+sequential scans are disabled for the check, because the planner prefers
+them on small tables even when a usable index exists.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from cart.models import CartItem, StockHold
+from orders.models import Order
+from .models import Category, Product
+from .pagination import CursorPaginator
+
+LISTING_PAGE = 13  # one page of 12 plus the row that tells there is a next page
+
+
+def _today():
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+def _subtree_page(ordering, after=None):
+    # A category with subcategories, read the way paginate() reads it: its
+    # categories' index ranges merged (see Category.product_filters)
+    paginator = CursorPaginator(
+        Product.objects.filter(available=True), LISTING_PAGE - 1, ordering,
+        partitions=[Q(category_id=pk) for pk in (1, 2, 3)],
+    )
+    return paginator.page_queryset(after)
+
+
+HOT_QUERIES = {
+    'products by name': lambda: Product.objects.filter(available=True).order_by('name', 'id')[:LISTING_PAGE],
+    'products by name, later page': lambda: Product.objects.filter(available=True).filter(
+        CursorPaginator(Product.objects.none(), 12, ['name'])._after(['m', 0], backwards=False)
+    ).order_by('name', 'id')[:LISTING_PAGE],
+    'products by price': lambda: Product.objects.filter(available=True).order_by('price', 'id')[:LISTING_PAGE],
+    'products by price, descending': lambda: (
+        Product.objects.filter(available=True).order_by('-price', '-id')[:LISTING_PAGE]
+    ),
+    'newest products': lambda: Product.objects.filter(available=True).order_by('-created_at', '-id')[:LISTING_PAGE],
+    'category products': lambda: Product.objects.filter(
+        Category(pk=1, path='1/').product_filters(descendant_ids=[])[0], available=True,
+    ).order_by('name', 'id')[:LISTING_PAGE],
+    'category tree products': lambda: _subtree_page(['name']),
+    'category tree products, later page': lambda: _subtree_page(['name'], ['m', 0]),
+    'category tree products by price': lambda: _subtree_page(['price']),
+    'category tree products, newest': lambda: _subtree_page(['-created_at']),
+    # What the cached COUNT(*) of a category page reads
+    'category tree count': lambda: Product.objects.filter(
+        category_id__in=[1, 2, 3], available=True,
+    ).order_by().values('pk'),
+    'featured products': lambda: Product.objects.filter(featured=True, available=True)[:8],
+    'low stock': lambda: Product.objects.filter(stock__lte=10, available=True).order_by('stock')[:5],
+    'order history': lambda: Order.objects.filter(user_id=1).order_by('-created_at', '-id')[:11],
+    'orders by status': lambda: Order.objects.filter(status='pending').order_by('-created_at', '-id')[:21],
+    'recent orders': lambda: Order.objects.order_by('-created_at')[:5],
+    "today's orders": lambda: Order.objects.filter(
+        created_at__gte=_today()[0], created_at__lt=_today()[1]
+    ),
+    'anonymous cart': lambda: CartItem.objects.filter(session_key='0' * 32),
+    'user cart': lambda: CartItem.objects.filter(user_id=1),
+    'stock holds': lambda: StockHold.objects.filter(product_id=1, expires_at__gt=timezone.now()),
+}
+
+# Queries that read one page of a sorted list. Besides not scanning a
+# table, they must not sort: that would sort every matching row per page.
+LISTING_QUERIES = {
+    'products by name', 'products by name, later page', 'products by price',
+    'products by price, descending', 'newest products', 'category products',
+    'category tree products', 'category tree products, later page',
+    'category tree products by price', 'category tree products, newest', 'featured products',
+    'low stock', 'order history', 'orders by status', 'recent orders',
+}
+
+# First pages that read a partial index from one end: every entry in it
+# is a row of the listing, so the walk stops after one page. Anywhere else,
+# reading a whole index is as much a full scan as reading the table.
+INDEX_WALKS = {
+    'products by name': 'store_prod_avail_name_idx',
+    'products by price': 'store_prod_avail_price_idx',
+    'products by price, descending': 'store_prod_avail_price_idx',
+    'newest products': 'store_prod_avail_new_idx',
+    'featured products': 'store_prod_featured_idx',
+    'recent orders': 'orders_orde_created_idx',
+}
+
+# "SCAN t" and "SCAN t USING [COVERING] INDEX i", but not a SEARCH with an
+# index constraint, nor CONSTANT ROW, subqueries or virtual tables
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT|SUBQUERY|\()(\S+)(?: USING (?:COVERING )?INDEX (\S+))?$')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\S+)')
+SQLITE_SORT = re.compile(r'\bUSE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY$')
+POSTGRES_SORT = re.compile(r'(?:^|->)\s*Sort\b')
+
+
+def full_scans(plan, listing=False, walk=None):
+    """
+    Tables a textual query plan reads in full, with or without an index,
+    except by the ``walk`` index; with ``listing``, also ``'ORDER BY'``
+    when it sorts the rows it read.
+    """
+    sqlite = connection.vendor == 'sqlite'
+    pattern = SQLITE_FULL_SCAN if sqlite else POSTGRES_FULL_SCAN
+    found = [
+        match.group(1) for match in map(pattern.search, plan.splitlines())
+        if match and not (sqlite and walk and match.group(2) == walk)
+    ]
+    if listing and any(map((SQLITE_SORT if sqlite else POSTGRES_SORT).search, plan.splitlines())):
+        found.append('ORDER BY')
+    return found
+
+
+def check_plans(names=None):
+    """
+    Yield ``(name, plan, problems)`` for each hot query: the tables it
+    scans in full, plus ``'ORDER BY'`` for a listing that sorts.
+    """
+    postgres = connection.vendor == 'postgresql'
+    if postgres:
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+    try:
+        for name in names or HOT_QUERIES:
+            plan = HOT_QUERIES[name]().explain()
+            yield name, plan, full_scans(plan, listing=name in LISTING_QUERIES, walk=INDEX_WALKS.get(name))
+    finally:
+        if postgres:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
@@ -0,0 +1,131 @@
+# store/search.py
+import re
+
+from django.db import connection
+from django.db.models import Q, Value, FloatField
+
+FTS_TABLE = 'store_product_fts'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts_available = None
+
+
+def fts_available():
+    """Return True when the SQLite FTS5 product index exists."""
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != 'sqlite':
+            _fts_available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [FTS_TABLE]
+                )
+                _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 expression where every word is a prefix term."""
+    tokens = TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(queryset, query):
+    """
+    Filter a Product queryset by a search query and annotate ``search_rank``.
+
+    Lower ranks are more relevant, so order by ``search_rank`` ascending.
+    Falls back to substring matching when the FTS index is not available.
+    """
+    no_rank = Value(0.0, output_field=FloatField())
+    match = build_match_query(query)
+    if match is None:
+        return queryset.none().annotate(search_rank=no_rank)
+
+    if not fts_available():
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query)
+        ).annotate(search_rank=no_rank)
+
+    # Join the index in, rather than filtering on a subquery, so MATCH runs
+    # once and bm25() scores each row as that one scan produces it.
+    # Column weights: name, description, category
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = store_product.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+        select={'search_rank': f'bm25({FTS_TABLE}, 10.0, 1.0, 4.0)'},
+    )
+
+
+def index_product(product):
+    """Insert or refresh a single product in the FTS index."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description, category) '
+            'SELECT %s, %s, %s, name FROM store_category WHERE id = %s',
+            [product.pk, product.name, product.description, product.category_id]
+        )
+
+
+def index_products(queryset):
+    """Insert or refresh every product in ``queryset`` with two statements."""
+    if not fts_available():
+        return
+    product_ids = list(queryset.values_list('id', flat=True))
+    if not product_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description, category) '
+            'SELECT p.id, p.name, p.description, c.name '
+            'FROM store_product p JOIN store_category c ON c.id = p.category_id '
+            f'WHERE p.id IN ({placeholders})',
+            product_ids
+        )
+
+
+def remove_product(product_id):
+    """Drop a product from the FTS index."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def reindex_category(category):
+    """Refresh the category name stored for every product in a category."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET category = %s '
+            'WHERE rowid IN (SELECT id FROM store_product WHERE category_id = %s)',
+            [category.name, category.pk]
+        )
+
+
+def rebuild_index():
+    """Repopulate the FTS index from the product and category tables."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description, category) '
+            'SELECT p.id, p.name, p.description, c.name '
+            'FROM store_product p JOIN store_category c ON c.id = p.category_id'
+        )
+        return cursor.rowcount
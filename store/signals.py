@@ -0,0 +1,37 @@
+# store/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, Product
+from . import images, search
+from .cache import bump, CATALOGUE_NAMESPACE, product_namespace
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    search.index_product(instance)
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    if not created:
+        search.reindex_category(instance)
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_pages(sender, instance, **kwargs):
+    bump(CATALOGUE_NAMESPACE, product_namespace(instance.slug))
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    bump(CATALOGUE_NAMESPACE)
+
+@receiver(post_save, sender=Product)
+def resize_product_image(sender, instance, **kwargs):
+    if 'image' in instance.get_deferred_fields():
+        return
+    if instance.image and instance.image.name != getattr(instance, '_saved_image', None):
+        images.schedule_variants(instance.pk)
+    instance._saved_image = instance.image.name
@@ -0,0 +1,42 @@
+# store/templatetags/product_images.py
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+from store import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_image(product, size='grid', css_class='', style='', lazy=True):
+    """
+    ``<picture>`` for ``product`` at one of ``store.images.SIZES``, offering
+    WebP first. Falls back to the original upload until the variants exist.
+    """
+    if not product.image:
+        return ''
+    loading = 'lazy' if lazy else 'eager'
+    found = images.variant(product, size)
+    if found is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}">',
+            product.image.url, product.name, css_class, style, loading,
+        )
+
+    img = format_html(
+        '<img src="{}" alt="{}" class="{}" style="{}" width="{}" height="{}" loading="{}" decoding="async">',
+        default_storage.url(found['src']), product.name, css_class, style,
+        found['width'], found['height'], loading,
+    )
+    if 'webp' not in found:
+        return img
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">{}</picture>',
+        default_storage.url(found['webp']), img,
+    )
+
+
+@register.filter
+def image_url(product, size='grid'):
+    """``{{ product|image_url:'thumb' }}``: URL of the best image for a size."""
+    return images.image_url(product, size)
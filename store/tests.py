@@ -0,0 +1,655 @@
+import base64
+import io
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.db.models import F, Q
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from PIL import Image
+from ecommerce_store.replicas import PIN_COOKIE, ReplicaRoutingMiddleware
+from ecommerce_store.testing import QueryBudgetMixin
+from orders.models import Order, OrderItem
+from .catalogue import read_rows, import_products, export_rows, write_rows
+from . import search
+from .search import search_products
+from .benchmarks import SCENARIOS, seed_catalogue, run_benchmarks, compare_results
+from .images import image_url
+from .models import Category, Product
+from .pagination import CursorPaginator
+from .query_plans import full_scans
+
+
+class StorefrontQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        root = Category.objects.create(name='Clothing', slug='clothing')
+        leaf = Category.objects.create(name='Shirts', slug='shirts', parent=root)
+        for i in range(15):
+            Product.objects.create(
+                name=f'Shirt {i}', slug=f'shirt-{i}', category=leaf,
+                description='Cotton shirt', price=10 + i, stock=5, featured=True
+            )
+        self.user = User.objects.create_user(
+            'shopper', 'shopper@example.com', 'pass12345', is_staff=True
+        )
+        self.client.force_login(self.user)
+
+    def test_storefront_pages(self):
+        for path in [
+            '/', '/products/', '/products/?q=shirt', '/products/?sort=price_high',
+            '/product/shirt-3/', '/category/clothing/', '/products/?q=!!!&sort=price_low', '/products/?q=!!!',
+        ]:
+            with self.subTest(path=path):
+                response = self.assertWithinQueryBudget(path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_panel_pages(self):
+        products = list(Product.objects.all()[:3])
+        for i in range(25):
+            order = Order.objects.create(
+                user=self.user, first_name='Shop', last_name='Per', email='shopper@example.com',
+                address='1 Street', city='Town', state='ST', postal_code='12345', phone='555',
+                payment_method='cod', total_amount=30,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price=10) for product in products
+            ])
+        for path in [
+            '/admin-panel/', '/admin-panel/products/', '/admin-panel/orders/',
+            '/admin-panel/users/', '/admin-panel/categories/',
+        ]:
+            with self.subTest(path=path):
+                response = self.assertWithinQueryBudget(path)
+                self.assertEqual(response.status_code, 200)
+
+
+class ProfilingMetricsTests(TestCase):
+    def test_metrics_are_staff_only(self):
+        # The test client connects from 127.0.0.1, like a local reverse proxy
+        self.assertEqual(self.client.get('/_metrics/').status_code, 404)
+        staff = User.objects.create_user('ops', 'ops@example.com', 'pass12345', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/_metrics/').status_code, 200)
+
+
+# Savepoints from the test transaction would trip the over-budget log
+@override_settings(PROFILING_ENABLED=False)
+class BenchmarkSmokeTests(TestCase):
+    def test_every_scenario_runs(self):
+        seed_catalogue(products=60, depth=2, breadth=2, users=3)
+        results = run_benchmarks(iterations=3)
+        self.assertEqual(list(results), list(SCENARIOS))
+        for row in results.values():
+            self.assertEqual(row['requests'], 3)
+            self.assertGreater(row['max_queries'], 0)
+
+        slower = {name: dict(row, max_queries=row['max_queries'] + 1) for name, row in results.items()}
+        regressions = [row for row in compare_results(results, slower) if row[-1]]
+        self.assertEqual({row[1] for row in regressions}, {'max_queries'})
+
+
+class PageCacheTests(TestCase):
+    pages = ['/', '/products/', '/product/desk-lamp/', '/category/lighting/']
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Lighting', slug='lighting')
+        self.product = Product.objects.create(
+            name='Desk Lamp', slug='desk-lamp', category=self.category,
+            description='Lamp', price=30, stock=5, featured=True
+        )
+
+    def queries_for(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_anonymous_hits_run_no_queries(self):
+        for path in self.pages:
+            with self.subTest(path=path):
+                self.assertGreater(self.queries_for(path), 0)
+                self.assertEqual(self.queries_for(path), 0)
+
+    def test_product_save_and_delete_invalidate(self):
+        self.client.get('/product/desk-lamp/')
+        self.client.get('/products/')
+        self.product.price = 45
+        self.product.save()
+        self.assertContains(self.client.get('/product/desk-lamp/'), '$45')
+        self.product.delete()
+        self.assertEqual(self.client.get('/product/desk-lamp/').status_code, 404)
+        self.assertNotContains(self.client.get('/products/'), 'Desk Lamp')
+
+    def test_category_save_and_delete_invalidate(self):
+        self.client.get('/category/lighting/')
+        self.client.get('/')
+        self.category.name = 'Lights'
+        self.category.save()
+        self.assertContains(self.client.get('/category/lighting/'), 'Lights')
+        self.category.delete()
+        self.assertEqual(self.client.get('/category/lighting/').status_code, 404)
+        self.assertNotContains(self.client.get('/'), 'Lights')
+
+    def test_visitors_with_a_session_bypass_the_cache(self):
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.client.force_login(user)
+        for path in self.pages:
+            self.queries_for(path)
+            self.assertGreater(self.queries_for(path), 0)
+
+        self.client.logout()
+        self.client.post('/cart/add/', {'product_id': self.product.pk, 'quantity': 1})
+        for path in self.pages:
+            self.queries_for(path)
+            self.assertGreater(self.queries_for(path), 0)
+
+
+class CursorPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Tiles', slug='tiles')
+        # Four prices for 11 products, so pages split runs of equal sort keys
+        for i in range(11):
+            Product.objects.create(name=f'Tile {i}', slug=f'tile-{i}', category=category,
+                                   description='Tile', price=10 + i % 4, stock=1)
+        self.products = Product.objects.all()
+
+    def walk(self, ordering):
+        paginator = CursorPaginator(self.products, 3, ordering)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def ids(self, page):
+        return [product.pk for product in page]
+
+    def test_forward_and_backward_with_tied_keys(self):
+        for ordering in (['price'], ['-price'], ['name']):
+            with self.subTest(ordering=ordering):
+                paginator, pages = self.walk(ordering)
+                expected = list(self.products.order_by(
+                    *ordering, '-pk' if ordering[0].startswith('-') else 'pk'
+                ).values_list('pk', flat=True))
+                self.assertEqual([pk for page in pages for pk in self.ids(page)], expected)
+                self.assertEqual([len(page) for page in pages], [3, 3, 3, 2])
+
+                self.assertFalse(pages[0].has_previous())
+                for number in range(len(pages) - 1, 0, -1):
+                    previous = paginator.get_page(pages[number].previous_cursor)
+                    self.assertEqual(self.ids(previous), self.ids(pages[number - 1]))
+                    self.assertTrue(previous.has_next())
+                    self.assertEqual(previous.has_previous(), number > 1)
+
+    def test_partitions_merge_into_the_same_pages(self):
+        grout = Category.objects.create(name='Grout', slug='grout')
+        Product.objects.filter(pk__in=list(self.products.values_list('pk', flat=True)[::3])).update(category=grout)
+        partitions = [Q(category__slug='tiles'), Q(category=grout)]
+        for ordering in (['price'], ['-price'], ['name']):
+            with self.subTest(ordering=ordering):
+                paginator = CursorPaginator(self.products, 3, ordering, partitions=partitions)
+                _, pages = self.walk(ordering)
+                page = paginator.get_page()
+                for expected in pages:
+                    self.assertEqual(self.ids(page), self.ids(expected))
+                    page = paginator.get_page(page.next_cursor) if page.has_next() else None
+                self.assertIsNone(page)
+
+    def test_last_page(self):
+        _, pages = self.walk(['price'])
+        last = pages[-1]
+        self.assertFalse(last.has_next())
+        self.assertIsNone(last.next_cursor)
+        self.assertTrue(last.has_previous())
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        paginator = CursorPaginator(self.products, 3, ['price'])
+        first = self.ids(paginator.get_page())
+        valid = paginator.get_page().next_cursor
+        tampered = [
+            'not-a-cursor',
+            valid[:-4],
+            base64.urlsafe_b64encode(b'{"d": "n", "v": [10]}').decode(),  # missing the pk
+            base64.urlsafe_b64encode(b'{"d": "x", "v": ["10", 1]}').decode(),
+            base64.urlsafe_b64encode(b'{"d": "n", "v": ["ten", 1]}').decode(),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(self.ids(page), first)
+                self.assertFalse(page.has_previous())
+        self.assertEqual(self.client.get('/products/?cursor=not-a-cursor').status_code, 200)
+
+    def test_count_is_cached_for_counted_listings(self):
+        self.assertIn('product_list', settings.CURSOR_PAGINATION_COUNTS)
+        self.assertEqual(self.client.get('/products/').context['page_obj'].paginator.count, 11)
+        with self.assertNumQueries(1):
+            self.assertEqual(CursorPaginator(self.products, 3, ['name'], with_count=True).count, 11)
+        # A fresh paginator over the same query reads the cached count
+        with self.assertNumQueries(0):
+            self.assertEqual(CursorPaginator(self.products, 3, ['price'], with_count=True).count, 11)
+        self.assertIsNone(CursorPaginator(self.products, 12, ['name']).count)
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        self.home = Category.objects.create(name='Home', slug='home')
+        self.garden = Category.objects.create(name='Garden', slug='garden')
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting', parent=self.home)
+        self.lamps = Category.objects.create(name='Lamps', slug='lamps', parent=self.lighting)
+
+    def tree(self):
+        return {c.slug: (c.path, c.depth, c.full_name) for c in Category.objects.all()}
+
+    def test_new_categories_get_tree_fields(self):
+        self.assertEqual(self.tree()['lamps'], (
+            f'{self.home.pk}/{self.lighting.pk}/{self.lamps.pk}/', 2, 'Home > Lighting > Lamps'
+        ))
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.lighting.parent = self.garden
+        self.lighting.save()
+        tree = self.tree()
+        self.assertEqual(tree['lighting'], (f'{self.garden.pk}/{self.lighting.pk}/', 1, 'Garden > Lighting'))
+        self.assertEqual(tree['lamps'], (
+            f'{self.garden.pk}/{self.lighting.pk}/{self.lamps.pk}/', 2, 'Garden > Lighting > Lamps'
+        ))
+        self.assertEqual(list(self.garden.get_descendants().order_by('depth')), [self.lighting, self.lamps])
+        self.assertFalse(self.home.get_descendants().exists())
+
+        self.lighting.parent = None
+        self.lighting.save()
+        self.assertEqual(self.tree()['lamps'], (
+            f'{self.lighting.pk}/{self.lamps.pk}/', 1, 'Lighting > Lamps'
+        ))
+
+    def test_rename_cascades_full_name(self):
+        self.home.name = 'House'
+        self.home.save()
+        tree = self.tree()
+        self.assertEqual(tree['lighting'][2], 'House > Lighting')
+        self.assertEqual(tree['lamps'][2], 'House > Lighting > Lamps')
+
+    def test_saving_a_stale_instance_keeps_the_tree(self):
+        stale = Category.objects.select_related('parent').get(slug='lamps')
+        self.lighting.parent = self.garden
+        self.lighting.save()
+        stale.description = 'Table and floor lamps'
+        stale.save()
+        self.assertEqual(self.tree()['lamps'], (
+            f'{self.garden.pk}/{self.lighting.pk}/{self.lamps.pk}/', 2, 'Garden > Lighting > Lamps'
+        ))
+
+    def test_cannot_move_under_own_descendant(self):
+        self.home.parent = self.lamps
+        with self.assertRaises(ValueError):
+            self.home.save()
+        with self.assertRaises(ValidationError):
+            self.home.clean()
+        self.lighting.parent = self.lighting
+        with self.assertRaises(ValueError):
+            self.lighting.save()
+        self.home.refresh_from_db()
+        self.assertIsNone(self.home.parent_id)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting')
+        furniture = Category.objects.create(name='Furniture', slug='furniture')
+        for name, slug, category, description, price in [
+            ('Brass Lamp', 'brass-lamp', self.lighting, 'A desk light', 40),
+            ('Oak Desk', 'oak-desk', furniture, 'Fits a brass lamp nicely', 200),
+            ('Reading Light', 'reading-light', self.lighting, 'Clip-on light', 15),
+            ('Floor Lamp', 'floor-lamp', self.lighting, 'Tall light', 90),
+        ]:
+            Product.objects.create(name=name, slug=slug, category=category,
+                                   description=description, price=price, stock=3)
+
+    def search(self, query, queryset=None):
+        results = search_products(queryset or Product.objects.all(), query)
+        return list(results.order_by('search_rank', 'name').values_list('slug', flat=True))
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('brass'), ['brass-lamp', 'oak-desk'])
+
+    def test_every_word_is_a_prefix_term(self):
+        *name_matches, description_match = self.search('lam')
+        self.assertEqual(sorted(name_matches), ['brass-lamp', 'floor-lamp'])
+        self.assertEqual(description_match, 'oak-desk')
+        self.assertEqual(self.search('floo la'), ['floor-lamp'])
+        self.assertEqual(sorted(self.search('lighting')), ['brass-lamp', 'floor-lamp', 'reading-light'])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_combines_with_category_and_price_filters(self):
+        products = Product.objects.filter(self.lighting.product_filters()[0], price__lte=50)
+        self.assertEqual(self.search('light', products), ['reading-light', 'brass-lamp'])
+        response = self.client.get('/products/?q=lamp&category=lighting&min_price=50')
+        self.assertEqual([p.slug for p in response.context['page_obj']], ['floor-lamp'])
+
+    def test_substring_fallback_without_fts(self):
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.assertEqual(self.search('rass'), ['brass-lamp', 'oak-desk'])
+            self.assertEqual(self.search('furni'), ['oak-desk'])
+
+
+class CatalogueImportTests(TestCase):
+    ROWS = (
+        '{"name": "Desk Lamp", "category": "Home > Lighting", "description": "LED", "price": "19.99", "stock": 4}\n'
+        '{"name": "Desk Lamp", "category": "Home > Lighting", "description": "Brass", "price": "49.00", "stock": 1}\n'
+        '{"name": "Kettle", "category": "Home > Kitchen", "description": "Steel", "price": "25", "featured": "yes"}\n'
+    )
+
+    def test_import_resolves_categories_and_slugs(self):
+        written = import_products(read_rows(io.StringIO(self.ROWS), 'jsonl'), batch_size=2)
+        self.assertEqual(written, 3)
+        self.assertEqual(
+            sorted(Category.objects.values_list('full_name', flat=True)),
+            ['Home', 'Home > Kitchen', 'Home > Lighting']
+        )
+        lamp = Product.objects.get(slug='desk-lamp-2')
+        self.assertEqual((lamp.description, lamp.category.full_name), ('Brass', 'Home > Lighting'))
+        self.assertTrue(Product.objects.get(slug='kettle').featured)
+        self.assertEqual(
+            list(search_products(Product.objects.all(), 'brass').values_list('slug', flat=True)),
+            ['desk-lamp-2']
+        )
+
+    def test_export_round_trips_as_update(self):
+        import_products(read_rows(io.StringIO(self.ROWS), 'jsonl'))
+        Product.objects.filter(slug='kettle').update(price=30)
+
+        exported = io.StringIO()
+        self.assertEqual(write_rows(export_rows(), exported, 'csv'), 3)
+        Product.objects.filter(slug='kettle').update(price=99)
+        exported.seek(0)
+        import_products(read_rows(exported, 'csv'))
+
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(Product.objects.get(slug='kettle').price, 30)
+
+
+    def test_generated_slugs_skip_explicit_and_existing_slugs(self):
+        rows = (
+            '{"slug": "desk-lamp-2", "name": "Floor Lamp", "category": "Lighting", "price": "80"}\n'
+            '{"name": "Desk Lamp", "category": "Lighting", "price": "20"}\n'
+            '{"name": "Desk Lamp", "category": "Lighting", "price": "45"}\n'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as handle:
+            handle.write(rows)
+        self.addCleanup(os.remove, handle.name)
+
+        for _ in range(2):  # the second run updates the same three products
+            call_command('import_catalogue', handle.name, stdout=io.StringIO())
+            self.assertEqual(
+                dict(Product.objects.values_list('slug', 'name')),
+                {'desk-lamp': 'Desk Lamp', 'desk-lamp-2': 'Floor Lamp', 'desk-lamp-3': 'Desk Lamp'}
+            )
+
+        Product.objects.filter(slug='desk-lamp-3').update(slug='kettle', name='Kettle')
+        written = import_products(read_rows(io.StringIO(rows), 'jsonl'))
+        self.assertEqual(written, 3)
+        self.assertEqual(Product.objects.get(slug='desk-lamp-3').price, 45)
+        self.assertEqual(Product.objects.get(slug='kettle').name, 'Kettle')
+
+
+class ProductImageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANTS_ASYNC=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name='Lighting', slug='lighting')
+
+    def upload(self, size=(2000, 1500)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'orange').save(buffer, 'JPEG')
+        return SimpleUploadedFile('lamp.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variants_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Lamp', slug='lamp', category=self.category,
+                description='LED', price=20, image=self.upload(),
+            )
+        product.refresh_from_db()
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual((variants['thumb']['width'], variants['thumb']['height']), (160, 160))
+        self.assertEqual((variants['grid']['width'], variants['grid']['height']), (480, 360))
+        self.assertIn(product.image.name.split('/')[-1].split('.')[0], variants['grid']['src'])
+
+        html = Template(
+            "{% load product_images %}{% product_image product 'grid' 'product-image' %}"
+        ).render(Context({'product': product}))
+        self.assertIn(variants['grid']['src'], html)
+        self.assertIn('width="480"', html)
+
+    def test_new_upload_falls_back_to_original_until_resized(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Lamp', slug='lamp', category=self.category,
+                description='LED', price=20, image=self.upload(),
+            )
+        product.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            product.image = self.upload((800, 800))
+            product.save()
+        self.assertEqual(len(callbacks), 1)
+        # The stored variants belong to the previous file
+        self.assertEqual(image_url(product, 'grid'), product.image.url)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            product.price = 25
+            product.save()
+        self.assertEqual(callbacks, [])
+
+
+class StaticAssetTests(TestCase):
+    def test_collectstatic_fingerprints_and_compresses(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'ecommerce_store.storage.CompressedManifestStaticFilesStorage'},
+        }
+        with override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            cache.clear()
+            html = self.client.get('/').content.decode()
+
+        stylesheet = next(name for name in os.listdir(os.path.join(static_root, 'css'))
+                          if re.fullmatch(r'store\.[0-9a-f]{12}\.css', name))
+        self.assertIn(f'/static/css/{stylesheet}', html)
+        self.assertTrue(os.path.exists(os.path.join(static_root, 'css', stylesheet + '.gz')))
+        self.assertNotIn('<style>', html)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    def route(self, path, write=False, model=Product, **cookies):
+        """Databases a request for ``path`` reads from, before and after writing."""
+        request = RequestFactory().get(path)
+        request.COOKIES.update(cookies)
+        request.resolver_match = match = resolve(path)
+        used = []
+
+        def view(request):
+            middleware.process_view(request, match.func, match.args, match.kwargs)
+            used.append(router.db_for_read(model))
+            if write:
+                router.db_for_write(model)
+                used.append(router.db_for_read(model))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        return used, middleware(request)
+
+    def test_catalogue_and_reports_read_from_replica(self):
+        self.assertEqual(self.route('/products/')[0], ['replica'])
+        self.assertEqual(self.route('/admin-panel/')[0], ['replica'])
+
+    def test_other_views_read_from_primary(self):
+        self.assertEqual(self.route('/cart/')[0], ['default'])
+        self.assertEqual(self.route('/products/', model=Session)[0], ['default'])
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_write_pins_request_and_browser_to_primary(self):
+        used, response = self.route('/products/', write=True)
+        self.assertEqual(used, ['replica', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.route('/products/', **{PIN_COOKIE: '1'})[0], ['default'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaDatabaseTests(QueryBudgetMixin, TransactionTestCase):
+    """Routing against a real second SQLite file, replicated by backup."""
+
+    # The alias is added after the test runner has set up its databases: it
+    # is a plain file that replicate() overwrites, not a test database
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handle, cls.replica_name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.settings['replica1'] = {**connections['default'].settings_dict, 'NAME': cls.replica_name}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+        super().tearDownClass()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cls.replica_name + suffix):
+                os.remove(cls.replica_name + suffix)
+
+    def replicate(self):
+        for alias in ('default', 'replica1'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections['replica1'].connection)
+
+    def setUp(self):
+        category = Category.objects.create(name='Lighting', slug='lighting')
+        self.product = Product.objects.create(
+            name='Desk Lamp', slug='desk-lamp', category=category,
+            description='Lamp', price=30, stock=5, featured=True
+        )
+        User.objects.create_user('reader', 'reader@example.com', 'pass12345')
+        self.replicate()
+        Product.objects.using('replica1').update(name='Replica Lamp')
+        # Forget the page versions bumped above, as if they were long ago
+        cache.clear()
+
+    def test_storefront_reads_replica_until_the_visitor_writes(self):
+        self.assertContains(self.client.get('/'), 'Replica Lamp')
+
+        cache.clear()
+        response = self.client.post(
+            '/accounts/login/', {'username': 'reader', 'password': 'pass12345'}, follow=True
+        )
+        self.assertEqual(response.redirect_chain, [('/', 302)])
+        self.assertContains(response, 'Desk Lamp')
+        self.assertNotContains(response, 'Replica Lamp')
+
+    def test_page_changed_recently_is_not_cached_from_replica(self):
+        self.product.price = 45
+        self.product.save()  # bumps the product's page version
+        response = self.client.get('/product/desk-lamp/')
+        self.assertContains(response, '$45')
+        self.assertNotContains(response, 'Replica Lamp')
+
+        self.replicate()
+        self.assertContains(self.client.get('/product/desk-lamp/'), '$45')
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_page_unchanged_for_a_while_reads_replica(self):
+        self.product.price = 45
+        self.product.save()
+        self.assertContains(self.client.get('/product/desk-lamp/'), 'Replica Lamp')
+
+
+    def test_query_budget_counts_replica_queries(self):
+        with self.assertRaisesMessage(AssertionError, '[replica1] SELECT'):
+            self.assertWithinQueryBudget('/product/desk-lamp/', budget=0)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertNotIn('full scan', out.getvalue())
+        self.assertNotIn('sorts', out.getvalue())
+
+    def test_sorted_listing_is_flagged(self):
+        plan = Product.objects.filter(
+            category__in=Category(pk=1, path='1/').get_descendants(include_self=True), available=True
+        ).order_by('name', 'id')[:13].explain()
+        self.assertEqual(full_scans(plan, listing=True), ['ORDER BY'])
+
+    def test_index_walks_count_as_full_scans(self):
+        plan = '\n'.join([
+            '2 0 0 SCAN store_product USING INDEX store_prod_avail_name_idx',
+            '3 0 0 SCAN cart_cartitem USING COVERING INDEX cart_cartitem_user_id_292943b8',
+            '4 0 0 SCAN orders_order',
+            '5 0 0 SEARCH store_category USING INDEX store_category_path_61a9e93f (path>? AND path<?)',
+            '6 0 0 SCAN store_product_fts VIRTUAL TABLE INDEX 0:M3',
+            '7 0 0 SCAN (subquery-1)',
+            '8 0 0 SCAN CONSTANT ROW',
+        ])
+        self.assertEqual(full_scans(plan), ['store_product', 'cart_cartitem', 'orders_order'])
+        self.assertEqual(full_scans(plan, walk='store_prod_avail_name_idx'), ['cart_cartitem', 'orders_order'])
+
+    def test_sparse_subtree_reads_only_its_categories(self):
+        root = Category.objects.create(name='Garden', slug='garden')
+        children = [Category.objects.create(name=name, slug=name.lower(), parent=root) for name in ('Hoses', 'Tools')]
+        other = Category.objects.create(name='Kitchen', slug='kitchen')
+        Product.objects.bulk_create([
+            Product(name=f'Pan {i}', slug=f'pan-{i}', category=other, description='Pan', price=i, stock=1)
+            for i in range(200)
+        ] + [
+            Product(name=f'Hose {i}', slug=f'hose-{i}', category=children[i % 2], description='Hose', price=i, stock=1)
+            for i in range(4)
+        ])
+        category_filter, partitions = root.product_filters()
+        self.assertEqual(len(partitions), 3)
+        for ordering in (['name'], ['price'], ['-created_at']):
+            with self.subTest(ordering=ordering):
+                paginator = CursorPaginator(Product.objects.filter(available=True), 12, ordering,
+                                            partitions=partitions)
+                self.assertEqual(full_scans(paginator.page_queryset().explain(), listing=True), [])
+                self.assertEqual(len(paginator.get_page()), 4)
+        count_plan = Product.objects.filter(category_filter, available=True).order_by().values('pk').explain()
+        self.assertEqual(full_scans(count_plan), [])
+
+        # Hiding category_id from the planner walked the whole name index
+        hidden = Product.objects.alias(category_plus_0=F('category_id') + 0).filter(
+            category_plus_0__in=[category.pk for category in [root, *children]], available=True
+        ).order_by('name', 'id')[:13]
+        self.assertEqual(full_scans(hidden.explain(), listing=True), ['store_product'])
+
+    def test_category_pages_list_the_whole_subtree(self):
+        root = Category.objects.create(name='Home', slug='home')
+        leaf = Category.objects.create(name='Lamps', slug='lamps', parent=root)
+        for category, name in [(root, 'Rug'), (leaf, 'Lamp B'), (leaf, 'Lamp A')]:
+            Product.objects.create(name=name, slug=name.lower().replace(' ', '-'), category=category,
+                                   description=name, price=10, stock=1)
+        for slug, names in [('home', ['Lamp A', 'Lamp B', 'Rug']), ('lamps', ['Lamp A', 'Lamp B'])]:
+            response = self.client.get(f'/category/{slug}/')
+            self.assertEqual([product.name for product in response.context['page_obj']], names)
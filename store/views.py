@@ -1,41 +1,42 @@
 # store/views.py
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
-from django.db.models import Q
 from .models import Product, Category
+from .search import search_products
+from .cache import cache_storefront_page, product_namespace
+from .pagination import paginate
+from orders.rankings import top_products
 
+@cache_storefront_page()
 def home(request):
     featured_products = Product.objects.filter(featured=True, available=True)[:8]
     # Only get main categories (those without a parent)
     categories = Category.objects.filter(parent=None)
+    best_sellers = top_products(limit=4, available_only=True)
     context = {
         'featured_products': featured_products,
         'categories': categories,
+        'best_sellers': best_sellers,
     }
     return render(request, 'store/home.html', context)
 
+@cache_storefront_page()
 def product_list(request):
-    products = Product.objects.filter(available=True)
+    products = Product.objects.select_related('category').filter(available=True)
     categories = Category.objects.filter(parent=None)
     
     # Search functionality
     query = request.GET.get('q')
     if query:
-        products = products.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query)
-        )
+        products = search_products(products, query)
     
     # Category filter
     category_slug = request.GET.get('category')
     category = None
+    partitions = None
     if category_slug:
         category = get_object_or_404(Category, slug=category_slug)
-        products = products.filter(
-            Q(category=category) |
-            Q(category__parent=category)
-        )
+        category_filter, partitions = category.product_filters()
+        products = products.filter(category_filter)
     
     # Price filter
     min_price = request.GET.get('min_price')
@@ -45,21 +46,24 @@ def product_list(request):
     if max_price:
         products = products.filter(price__lte=max_price)
     
-    # Sorting
-    sort = request.GET.get('sort', 'name')
-    if sort == 'price_low':
-        products = products.order_by('price')
+    # Sorting (search results default to relevance)
+    sort = request.GET.get('sort') or ('relevance' if query else 'name')
+    listing = 'product_list'
+    if sort == 'relevance' and query:
+        # Ranks are computed per query, so relevance keeps numbered pages
+        ordering = ['search_rank', 'name']
+        listing = 'product_search'
+    elif sort == 'price_low':
+        ordering = ['price']
     elif sort == 'price_high':
-        products = products.order_by('-price')
+        ordering = ['-price']
     elif sort == 'newest':
-        products = products.order_by('-created_at')
+        ordering = ['-created_at']
     else:
-        products = products.order_by('name')
+        ordering = ['name']
     
     # Pagination
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, products, 12, ordering, listing, partitions)
     
     context = {
         'page_obj': page_obj,
@@ -72,8 +76,11 @@ def product_list(request):
     }
     return render(request, 'store/product_list.html', context)
 
+@cache_storefront_page(lambda slug: [product_namespace(slug)])
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, available=True)
+    product = get_object_or_404(
+        Product.objects.select_related('category__parent'), slug=slug, available=True
+    )
     related_products = Product.objects.filter(
         category=product.category, 
         available=True
@@ -85,11 +92,15 @@ def product_detail(request, slug):
     }
     return render(request, 'store/product_detail.html', context)
 
+@cache_storefront_page()
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug)
     
-    # Get direct subcategories of this category
-    subcategories = Category.objects.filter(parent=category)
+    # The whole subtree, to list its products; the direct subcategories
+    # are shown as well
+    descendants = list(category.get_descendants())
+    subcategories = sorted((sub for sub in descendants if sub.parent_id == category.pk), key=lambda sub: sub.pk)
+    ancestors = list(category.get_ancestors()) if category.depth else []
 
     # Classify subcategories into women/men/other for easier template rendering
     women_keywords = ['women', 'woman', "women's", 'female', 'ladies', 'girls']
@@ -106,21 +117,9 @@ def category_detail(request, slug):
         else:
             other_children.append(sub)
     
-    # Get all descendant categories (including current category)
-    def get_descendant_categories(cat):
-        descendants = [cat]
-        for child in Category.objects.filter(parent=cat):
-            descendants.extend(get_descendant_categories(child))
-        return descendants
-    
-    # Get all category IDs in the hierarchy
-    category_ids = [cat.id for cat in get_descendant_categories(category)]
-    
     # Get all products from this category and its descendants
-    products = Product.objects.filter(
-        category_id__in=category_ids,
-        available=True
-    )
+    category_filter, partitions = category.product_filters([sub.pk for sub in descendants])
+    products = Product.objects.filter(category_filter, available=True)
     
     # Price filter
     min_price = request.GET.get('min_price')
@@ -133,21 +132,20 @@ def category_detail(request, slug):
     # Sorting
     sort = request.GET.get('sort', 'name')
     if sort == 'price_low':
-        products = products.order_by('price')
+        ordering = ['price']
     elif sort == 'price_high':
-        products = products.order_by('-price')
+        ordering = ['-price']
     elif sort == 'newest':
-        products = products.order_by('-created_at')
+        ordering = ['-created_at']
     else:
-        products = products.order_by('name')
+        ordering = ['name']
     
     # Pagination
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, products, 12, ordering, 'category_detail', partitions)
     
     context = {
         'category': category,
+        'ancestors': ancestors,
         'subcategories': subcategories,
         'women_children': women_children,
         'men_children': men_children,